@@ -0,0 +1,146 @@
+"""
+Lokalny serwer zastępczy OpenAI do testów trybu wsadowego (bez kosztów i bez sieci).
+
+  python batch_standin_server.py [--port 8765] [--delay 0]
+  OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=test python blog_generator.py --batch --wait
+
+Obsługuje minimum używane przez blog_batch: /v1/files (upload + content), /v1/batches
+(create + retrieve), a także /v1/chat/completions i /v1/images/generations dla trybu
+synchronicznego. Odpowiedzi są stałe — sprawdzamy przepływ, nie treść.
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 1×1 PNG
+_PNG_B64 = ("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg==")
+
+_files: dict[str, dict] = {}
+_batches: dict[str, dict] = {}
+_lock = threading.Lock()
+DELAY_SEC = 0.0
+
+
+def _canned(custom_id: str, body: dict) -> str:
+    prompt = body.get("messages", [{}])[-1].get("content", "")
+    if custom_id.startswith("imgmeta") or "OPIS:" in prompt:
+        return "OPIS: Biurko w gabinecie lekarskim z dokumentacją.\nALT: Dokumentacja medyczna na biurku"
+    if custom_id.startswith("research") or "NOTATKI" in prompt:
+        return "Notatki (serwer zastępczy): fakty, praktyka, ryzyka, kroki, aktualność."
+    return "<h4>Sekcja z serwera zastępczego</h4>\n<p>Treść testowa artykułu.</p>"
+
+
+def _completion(custom_id: str, body: dict) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", ""),
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": _canned(custom_id, body)}}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+def _new_file(content: bytes, filename: str, purpose: str) -> dict:
+    fid = f"file-{uuid.uuid4().hex[:12]}"
+    meta = {"id": fid, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+            "filename": filename, "purpose": purpose}
+    with _lock:
+        _files[fid] = {"meta": meta, "content": content}
+    return meta
+
+
+def _run_batch(batch: dict):
+    lines = _files[batch["input_file_id"]]["content"].decode("utf-8").splitlines()
+    out = []
+    for raw in filter(str.strip, lines):
+        req = json.loads(raw)
+        out.append(json.dumps({
+            "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+            "custom_id": req["custom_id"],
+            "response": {"status_code": 200, "request_id": uuid.uuid4().hex,
+                         "body": _completion(req["custom_id"], req.get("body", {}))},
+            "error": None,
+        }, ensure_ascii=False))
+    output = _new_file("\n".join(out).encode("utf-8"), f"{batch['id']}_output.jsonl", "batch_output")
+    batch.update(status="completed", output_file_id=output["id"], completed_at=int(time.time()),
+                 request_counts={"total": len(out), "completed": len(out), "failed": 0})
+
+
+class Handler(BaseHTTPRequestHandler):
+    def _json(self, obj: dict, code: int = 200):
+        data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def do_POST(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path.endswith("/files"):
+            msg = BytesParser(policy=HTTP).parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + self._body())
+            fields = {part.get_param("name", header="content-disposition"): part for part in msg.iter_parts()}
+            upload = fields["file"]
+            purpose = fields["purpose"].get_content().strip() if "purpose" in fields else "batch"
+            return self._json(_new_file(upload.get_payload(decode=True), upload.get_filename() or "upload", purpose))
+        if path.endswith("/batches"):
+            req = json.loads(self._body())
+            if req.get("input_file_id") not in _files:
+                return self._json({"error": {"message": "No such file"}}, 404)
+            bid = f"batch_{uuid.uuid4().hex[:12]}"
+            batch = {"id": bid, "object": "batch", "endpoint": req.get("endpoint"),
+                     "input_file_id": req["input_file_id"], "completion_window": req.get("completion_window"),
+                     "status": "validating", "output_file_id": None, "error_file_id": None,
+                     "created_at": int(time.time()), "metadata": req.get("metadata"),
+                     "request_counts": {"total": 0, "completed": 0, "failed": 0}}
+            with _lock:
+                _batches[bid] = batch
+            threading.Timer(DELAY_SEC, _run_batch, args=(batch,)).start()
+            return self._json(batch)
+        if path.endswith("/chat/completions"):
+            return self._json(_completion("", json.loads(self._body())))
+        if path.endswith("/images/generations"):
+            self._body()
+            return self._json({"created": int(time.time()), "data": [{"b64_json": _PNG_B64}]})
+        self._json({"error": {"message": f"Nieobsługiwane: {path}"}}, 404)
+
+    def do_GET(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if len(parts) >= 3 and parts[-3] == "files" and parts[-1] == "content" and parts[-2] in _files:
+            data = _files[parts[-2]]["content"]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        if len(parts) >= 2 and parts[-2] == "files" and parts[-1] in _files:
+            return self._json(_files[parts[-1]]["meta"])
+        if len(parts) >= 2 and parts[-2] == "batches" and parts[-1] in _batches:
+            return self._json(_batches[parts[-1]])
+        self._json({"error": {"message": "Not found"}}, 404)
+
+    def log_message(self, fmt, *args):
+        print(f"🧪 {self.command} {self.path} → {args[1] if len(args) > 1 else ''}", flush=True)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--delay", type=float, default=0.0, help="sekundy do zakończenia każdej partii")
+    args = ap.parse_args()
+    DELAY_SEC = args.delay
+    print(f"🧪 Serwer zastępczy OpenAI: http://127.0.0.1:{args.port}/v1", flush=True)
+    ThreadingHTTPServer(("127.0.0.1", args.port), Handler).serve_forever()
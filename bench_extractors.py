@@ -0,0 +1,134 @@
+"""
+Benchmark ekstraktorów parsera na zapisanych stronach (bez sieci).
+
+  python bench_extractors.py                        # pomiar + porównanie z bench_fixtures/baseline.json
+  python bench_html_backends.py --record            # odśwież fixture'y z produkcji (wymaga sieci)
+  python bench_extractors.py --update-baseline      # zapisz bieżące wyniki jako baseline
+
+Dla każdego źródła z rejestru: czas parsowania + ekstrakcji, szczyt alokacji
+(tracemalloc), liczba artykułów i zapytań CSS na element; osobno _parse_date_str.
+Kod wyjścia 1, gdy źródło zwraca 0 artykułów albo czas wzrósł ponad próg.
+Fixture'y (przycięte strony list z wpisami o wielu klasach) i baseline są w repo.
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import parser_all_sources_combined_dziala as parser
+from bench_html_backends import FIXTURES_DIR, PAGES
+
+BASELINE_PATH = FIXTURES_DIR / "baseline.json"
+MIN_DELTA_MS = 1.0   # poniżej tego wzrost to szum pomiaru, nie regresja
+
+# formaty spotykane na stronach źródeł — uzupełniane tekstami dat z fixture'ów
+DATE_SAMPLES = [
+    "12.03.2026", "2026-03-12", "12-03-2026", "12/03/2026",
+    "Opublikowano: 3.2.2026, 10:15", "2026-03-12T08:00:00+01:00",
+    "Data publikacji 12.03.2026 r.", "bez daty",
+]
+
+
+def _date_corpus(pages: dict[str, str]) -> list[str]:
+    corpus = list(DATE_SAMPLES)
+    for html in pages.values():
+        soup = parser._make_soup(html)
+        for el in soup.select("time, .date, .pub-date, .entry-date, .news-date"):
+            txt = el.get_text(" ", strip=True)
+            if txt:
+                corpus.append(txt)
+    return corpus
+
+
+def _measure(fn, repeat: int) -> tuple[float, int, object]:
+    """(najlepszy czas s, szczyt alokacji B, wynik ostatniego przebiegu)."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def run(repeat: int) -> dict[str, dict]:
+    parser.CUTOFF = datetime.min   # zapisane strony się starzeją — nie filtruj po dacie
+    pages = {}
+    for key in PAGES:
+        path = FIXTURES_DIR / f"{key}.html"
+        if path.exists():
+            pages[key] = path.read_text(encoding="utf-8")
+        else:
+            print(f"⚠️ {key}: brak {path} (uruchom bench_html_backends.py --record)")
+
+    results: dict[str, dict] = {}
+    print(f"Backend: {parser.HTML_BACKEND}\n")
+    print(f"{'źródło':<14} {'ms':>8} {'KB alok.':>9} {'art.':>5} {'CSS/el.':>8}")
+    for key, html in pages.items():
+        src = PAGES[key]
+        parser._selector_stats.clear()
+        t, peak, found = _measure(lambda: parser._extract_from(html, src), repeat)
+        items = parser._selector_stats[key + ":items"] or 1
+        fanout = parser._selector_stats[key + ":css"] / items
+        results[key] = {"ms": round(t * 1000, 2), "alloc_kb": peak // 1024,
+                        "yield": len(found), "css_per_item": round(fanout, 2)}
+        print(f"{key:<14} {t * 1000:>8.1f} {peak // 1024:>9} {len(found):>5} {fanout:>8.1f}")
+
+    corpus = _date_corpus(pages)
+
+    def parse_all():
+        return [parser._parse_date_str(t) for t in corpus]
+
+    t, peak, parsed = _measure(parse_all, repeat)
+    ok = sum(1 for d in parsed if d)
+    results["_parse_date_str"] = {"ms": round(t * 1000, 2), "alloc_kb": peak // 1024, "yield": ok}
+    print(f"{'daty':<14} {t * 1000:>8.1f} {peak // 1024:>9} {ok:>5}/{len(corpus)}  "
+          f"({len(corpus) / t:,.0f} tekstów/s)")
+    return results
+
+
+def check(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> list[str]:
+    problems = []
+    for key, res in results.items():
+        if res["yield"] == 0:
+            problems.append(f"{key}: 0 wyników — selektory nie pasują do strony")
+        base = baseline.get(key)
+        if (base and base["ms"] > 0 and res["ms"] > base["ms"] * (1 + threshold)
+                and res["ms"] - base["ms"] > MIN_DELTA_MS):
+            problems.append(f"{key}: {res['ms']:.1f} ms vs baseline {base['ms']:.1f} ms "
+                            f"(> +{threshold:.0%})")
+    return problems
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--threshold", type=float, default=0.5,
+                    help="dopuszczalny wzrost czasu względem baseline (0.5 = +50%%)")
+    ap.add_argument("--update-baseline", action="store_true")
+    args = ap.parse_args()
+
+    results = run(args.repeat)
+    if len(results) <= 1:   # tylko _parse_date_str
+        sys.exit("❌ Brak fixture'ów do pomiaru.")
+
+    if args.update_baseline:
+        BASELINE_PATH.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\n💾 Baseline zapisany → {BASELINE_PATH}")
+        sys.exit(0)
+
+    baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8")) if BASELINE_PATH.exists() else {}
+    problems = check(results, baseline, args.threshold)
+    if problems:
+        print("\n❌ Regresja:")
+        for p in problems:
+            print(f"  - {p}")
+        sys.exit(1)
+    print("\n✅ Bez regresji" + ("" if baseline else " (brak baseline — tylko kontrola wyników)"))
@@ -0,0 +1,134 @@
+"""
+Benchmark backendów HTML dla parsera GenesManager (offline, na zapisanych stronach).
+
+  python bench_html_backends.py --record          # zapisz aktualne strony list do bench_fixtures/
+  python bench_html_backends.py [--repeat 5]      # porównaj backendy: pełne drzewo vs strainer
+  python bench_html_backends.py --check           # tylko kontrola strainerów (bez fixture'ów)
+
+Dla każdego źródła i dostępnego backendu mierzy czas parsowania + ekstrakcji
+oraz liczbę artykułów (strainer nie może zgubić artykułów względem pełnego drzewa).
+Kod wyjścia 1, gdy strainer gubi artykuły — na fixture'ach albo na próbkach elementów
+z wieloma klasami (STRAINER_SAMPLES), których _extract_from nie wykryje (fallback tylko przy 0).
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import parser_all_sources_combined_dziala as parser
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "bench_fixtures"   # niezależnie od katalogu roboczego
+
+# klucz źródła → skompilowana specyfikacja z rejestru parsera
+PAGES = parser._SOURCES_BY_KEY
+
+# elementy listy z wieloma klasami / dodatkowymi atrybutami — strainer musi je zachować
+STRAINER_SAMPLES = {
+    "nfz_centrala": """
+        <div class="news row"><h3 class="title"><a href="/a1">Komunikat NFZ w sprawie umów</a></h3>
+          <span class="date">12.03.2026</span></div>
+        <li class="news"><h3><a href="/a2">Zarządzenie Prezesa NFZ</a></h3><span class="date">11.03.2026</span></li>""",
+    "nfz_oddzialy": """
+        <div class="padding-left-40 x"><h3 class="title"><a href="/o1">Ogłoszenie o postępowaniu</a></h3>
+          <div class="date">12.03.2026</div></div>
+        <div class="padding-left-40"><h3 class="title"><a href="/o2">Aneksy do umów</a></h3>
+          <div class="date">11.03.2026</div></div>""",
+    "serwiszoz": """
+        <div id="yw0" class="list-view"><div class="items">
+          <article class="item featured"><h2><a href="/s1">Zmiany w rozliczeniach AOS</a></h2>
+            <p>Od 12.03.2026 obowiązują nowe zasady.</p></article>
+          <article class="item"><h2><a href="/s2">Nowe taryfy świadczeń</a></h2><p>11.03.2026</p></article>
+        </div></div>""",
+    "rynekzdrowia": """
+        <div class="box-4 promo"><a href="/r1" title="Dotacje dla szpitali"><div class="desc">
+          <h3>Dotacje dla szpitali</h3></div></a><span class="date">12.03.2026</span></div>
+        <ul class="list-2 big"><li><a href="/r2" title="KPO: nabór wniosków">KPO: nabór wniosków</a>
+          <span class="date">11.03.2026</span></li></ul>""",
+}
+
+
+def check_strainers(backend: str | None = None) -> list[str]:
+    """Próbki z wieloma klasami: strainer ma dać tyle samo artykułów co pełne drzewo."""
+    problems = []
+    for key, html in STRAINER_SAMPLES.items():
+        src = PAGES[key]
+        strainer = src.get("parse_only")
+        if strainer is None:
+            continue
+        full = parser._extract_items(src, parser._make_soup(html, backend=backend), keep_old=True)
+        strained = parser._extract_items(src, parser._make_soup(html, strainer, backend=backend), keep_old=True)
+        if not full or len(strained) != len(full):
+            problems.append(f"{key}: próbka — strainer {len(strained)} vs pełne drzewo {len(full)}")
+    return problems
+
+
+def record():
+    FIXTURES_DIR.mkdir(exist_ok=True)
+    for key, src in PAGES.items():
+        html = parser._fetch_html(src["url"])
+        if not html:
+            print(f"❌ {key}: brak strony")
+            continue
+        (FIXTURES_DIR / f"{key}.html").write_text(html, encoding="utf-8")
+        print(f"💾 {key}: {len(html) // 1024} KB")
+
+
+def _time_extract(html: str, src: dict, backend: str, strainer, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    found: list[dict] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        found = parser._extract_items(src, parser._make_soup(html, strainer, backend=backend))
+        best = min(best, time.perf_counter() - t0)
+    return best, len(found)
+
+
+def bench(repeat: int) -> list[str]:
+    parser.CUTOFF = datetime.min   # zapisane strony się starzeją — nie filtruj po dacie
+    backends = parser._available_backends()
+    problems = []
+    print(f"Backendy: {', '.join(backends)}  (domyślny: {parser.HTML_BACKEND})\n")
+    print(f"{'źródło':<14} {'backend':<13} {'pełne ms':>9} {'strainer ms':>12} {'art.':>5} {'art. S':>7}")
+    for key, src in PAGES.items():
+        path = FIXTURES_DIR / f"{key}.html"
+        if not path.exists():
+            print(f"{key:<14} — brak {path} (uruchom --record)")
+            continue
+        html = path.read_text(encoding="utf-8")
+        for backend in backends:
+            t_full, n_full = _time_extract(html, src, backend, None, repeat)
+            if backend == "html5-parser":
+                t_str, n_str = t_full, n_full   # brak obsługi parse_only
+            else:
+                t_str, n_str = _time_extract(html, src, backend, src.get("parse_only"), repeat)
+            flag = ""
+            if n_str != n_full:
+                flag = "  ⚠️ strainer gubi artykuły"
+                problems.append(f"{key} ({backend}): strainer {n_str} vs pełne drzewo {n_full}")
+            print(f"{key:<14} {backend:<13} {t_full * 1000:>9.1f} {t_str * 1000:>12.1f} "
+                  f"{n_full:>5} {n_str:>7}{flag}")
+    return problems
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--record", action="store_true", help="pobierz i zapisz strony do bench_fixtures/")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--check", action="store_true", help="tylko kontrola strainerów na próbkach")
+    args = ap.parse_args()
+    if args.record:
+        record()
+        sys.exit(0)
+
+    parser.CUTOFF = datetime.min
+    problems = [p for b in parser._available_backends() if b != "html5-parser" for p in check_strainers(b)]
+    if not args.check:
+        problems += bench(args.repeat)
+    if problems:
+        print("\n❌ Strainer gubi artykuły:")
+        for p in problems:
+            print(f"  - {p}")
+        sys.exit(1)
+    print("\n✅ Strainery bez strat")
@@ -0,0 +1,249 @@
+"""
+Tryb wsadowy blog_generator (OpenAI Batch API) — cały backlog topics.json w jednym runie,
+taniej na token, bez pośpiechu (okno 24 h).
+
+  python blog_generator.py --batch            # wyślij / sprawdź / dokończ (jeden krok na run, pod cron)
+  python blog_generator.py --batch --wait     # czekaj do końca obu etapów
+  python blog_generator.py --batch --limit 5  # maks. 5 tematów w partii
+
+Etapy: (1) research + meta obrazu wszystkich tematów, (2) artykuły z researchem.
+Obrazy (Images API) generowane są synchronicznie przy składaniu plików.
+Wygenerowane tematy są oznaczane w topics.json ("generated") i nie wracają do kolejnych partii;
+odpowiedzi obecne już w cache LLM nie są wysyłane drugi raz.
+Stan między runami: BLOG_BATCH_STATE_PATH. Lokalny serwer zastępczy: OPENAI_BASE_URL
+(np. `python batch_standin_server.py` → http://127.0.0.1:8765/v1).
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import blog_generator as bg
+from diskstore import write_json_atomic
+from llm_cache import llm_cache
+
+BLOG_BATCH_STATE_PATH = Path(os.getenv("BLOG_BATCH_STATE_PATH", "blog_batch_state.json"))
+BLOG_BATCH_POLL_SEC = max(5, int(os.getenv("BLOG_BATCH_POLL_SEC", "60")))
+BLOG_BATCH_WINDOW = "24h"
+
+_ENDPOINT = "/v1/chat/completions"
+_RUNNING = ("validating", "in_progress", "finalizing", "cancelling")
+
+
+# ─────────────────────────────────────────────
+# Stan partii
+# ─────────────────────────────────────────────
+def _load_state() -> dict | None:
+    try:
+        return json.loads(BLOG_BATCH_STATE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _save_state(state: dict | None):
+    if state is None:
+        BLOG_BATCH_STATE_PATH.unlink(missing_ok=True)
+        return
+    write_json_atomic(BLOG_BATCH_STATE_PATH, state, indent=2)
+
+
+def _pending_topics(topics_path: Path, limit: int | None) -> list[dict]:
+    """Ta sama kolejność co pick_next_topic: pillar przed cluster, potem priority."""
+    topics = json.loads(topics_path.read_text(encoding="utf-8"))
+    pending = [t for t in topics if not (t.get("published") or t.get("failed") or t.get("generated"))]
+    pending.sort(key=lambda t: (0 if t.get("type") == "pillar" else 1, t.get("priority", 99)))
+    return pending[:limit] if limit else pending
+
+
+# ─────────────────────────────────────────────
+# Batch API
+# ─────────────────────────────────────────────
+def _request_line(custom_id: str, messages: list[dict], use_primary: bool) -> dict:
+    # partia idzie jednym modelem (bez łańcucha fallback); parametry jak w _call_openai
+    model = bg.PRIMARY_MODEL if use_primary else bg.FALLBACK_MODEL
+    body = {"model": model, "messages": messages}
+    if model == bg.FALLBACK_MODEL:
+        body["temperature"] = 0.2
+    return {"custom_id": custom_id, "method": "POST", "url": _ENDPOINT, "body": body}
+
+
+def _submit(lines: list[dict], stage: str) -> str:
+    payload = "\n".join(json.dumps(l, ensure_ascii=False) for l in lines).encode("utf-8")
+    upload = bg.client.files.create(file=(f"blog_{stage}.jsonl", payload), purpose="batch")
+    batch = bg.client.batches.create(
+        input_file_id=upload.id,
+        endpoint=_ENDPOINT,
+        completion_window=BLOG_BATCH_WINDOW,
+        metadata={"pipeline": "genesmanager_blog", "stage": stage},
+    )
+    print(f"📤 Batch {stage}: {len(lines)} zapytań → {batch.id}", flush=True)
+    return batch.id
+
+
+def _read_results(batch) -> dict[str, str]:
+    """custom_id → treść odpowiedzi (tylko udane)."""
+    results: dict[str, str] = {}
+    if batch.output_file_id:
+        for raw in bg.client.files.content(batch.output_file_id).text.splitlines():
+            if not raw.strip():
+                continue
+            line = json.loads(raw)
+            resp = line.get("response") or {}
+            if resp.get("status_code") != 200:
+                continue
+            try:
+                content = (resp["body"]["choices"][0]["message"]["content"] or "").strip()
+            except (KeyError, IndexError, TypeError):
+                continue
+            if content:
+                results[line["custom_id"]] = content
+    if batch.error_file_id:
+        errors = bg.client.files.content(batch.error_file_id).text.splitlines()
+        print(f"⚠️ Batch {batch.id}: {len(errors)} błędnych zapytań", flush=True)
+    return results
+
+
+def _cache(stage: str, messages: list[dict], use_primary: bool, value: str):
+    # ten sam klucz co tryb synchroniczny — po nieudanej partii artykułów research jest już opłacony
+    if llm_cache:
+        llm_cache.put(stage, bg._cache_key(messages, use_primary), value)
+
+
+def _line_or_cached(lines: list[dict], cached: dict[str, str], custom_id: str, stage: str,
+                    messages: list[dict], use_primary: bool):
+    """Odpowiedź z cache LLM trafia od razu do cached; tylko brakujące idą do partii."""
+    hit = llm_cache.get(stage, bg._cache_key(messages, use_primary)) if llm_cache else None
+    if hit:
+        cached[custom_id] = hit
+    else:
+        lines.append(_request_line(custom_id, messages, use_primary))
+
+
+def _submit_or_skip(lines: list[dict], cached: dict[str, str], stage: str) -> str | None:
+    if cached:
+        print(f"💾 Batch {stage}: {len(cached)} odpowiedzi z cache LLM", flush=True)
+    return _submit(lines, stage) if lines else None
+
+
+# ─────────────────────────────────────────────
+# Etapy
+# ─────────────────────────────────────────────
+def _start_research(topics: list[dict]) -> dict | None:
+    if not topics:
+        return None
+    lines, cached = [], {}
+    for t in topics:
+        _line_or_cached(lines, cached, f"research-{t['id']}", "research",
+                        bg._research_messages(t["title"], t.get("angle", "")), True)
+        _line_or_cached(lines, cached, f"imgmeta-{t['id']}", "image_meta",
+                        bg._image_meta_messages(t["title"]), False)
+    return {
+        "stage": "research",
+        "batch_id": _submit_or_skip(lines, cached, "research"),
+        "cached": cached,
+        "created": time.time(),
+        "topics": {str(t["id"]): {"topic": t} for t in topics},
+    }
+
+
+def _start_articles(state: dict, results: dict[str, str]) -> dict | None:
+    ready = {}
+    for tid, entry in state["topics"].items():
+        t = entry["topic"]
+        research = results.get(f"research-{tid}")
+        if not research:
+            print(f"⚠️ Brak researchu dla tematu {tid} — wróci w kolejnej partii", flush=True)
+            continue
+        _cache("research", bg._research_messages(t["title"], t.get("angle", "")), True, research)
+        img_meta = results.get(f"imgmeta-{tid}")
+        if img_meta:
+            _cache("image_meta", bg._image_meta_messages(t["title"]), False, img_meta)
+        ready[tid] = {"topic": t, "research": bg._clean(research), "image_meta": img_meta or ""}
+    if not ready:
+        return None
+    lines, cached = [], {}
+    for tid, e in ready.items():
+        _line_or_cached(lines, cached, f"article-{tid}", "article",
+                        bg._article_messages(e["topic"], e["research"]), True)
+    return {"stage": "article", "batch_id": _submit_or_skip(lines, cached, "article"), "cached": cached,
+            "created": time.time(), "topics": ready}
+
+
+def _image_for(entry: dict) -> tuple[Path, str]:
+    t = entry["topic"]
+    img_desc, img_alt = bg._parse_image_meta(entry.get("image_meta") or "")
+    img_path = bg.IMAGES_DIR / bg._image_name(t)
+    if not entry.get("image_meta"):
+        return Path(""), img_alt
+    try:
+        if not bg._generate_image_png(img_desc, img_path):
+            img_path = Path("")
+    except Exception as e:
+        print(f"  ⚠️ Błąd obrazu ({t['id']}): {e}", flush=True)
+        img_path = Path("")
+    return img_path, img_alt
+
+
+def _finish(state: dict, results: dict[str, str]) -> dict[str, Path]:
+    done = {tid: e for tid, e in state["topics"].items() if results.get(f"article-{tid}")}
+    for tid in state["topics"].keys() - done.keys():
+        print(f"⚠️ Brak artykułu dla tematu {tid} — wróci w kolejnej partii", flush=True)
+    for tid, e in done.items():
+        _cache("article", bg._article_messages(e["topic"], e["research"]), True, results[f"article-{tid}"])
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        images = dict(zip(done, pool.map(_image_for, done.values())))
+    outputs = {}
+    for tid, e in done.items():
+        img_path, img_alt = images[tid]
+        outputs[tid] = bg._assemble_post(e["topic"], img_path, img_alt,
+                                         bg._clean_article(results[f"article-{tid}"]))
+    return outputs
+
+
+def run_batch(topics_path: Path = Path("topics.json"), limit: int | None = None, wait: bool = False) -> list[Path]:
+    """Jeden krok maszyny stanów (albo do końca przy wait=True). Zwraca zapisane pliki."""
+    if bg.client is None:
+        raise RuntimeError("Brak klienta OpenAI")
+
+    state = _load_state()
+    while True:
+        if state is None:
+            state = _start_research(_pending_topics(topics_path, limit))
+            _save_state(state)
+            if state is None:
+                print("Brak tematów do wygenerowania.")
+                return []
+
+        results = {}
+        if state.get("batch_id"):   # None = wszystko z cache LLM, nic nie wysłano
+            batch = bg.client.batches.retrieve(state["batch_id"])
+            if batch.status in _RUNNING:
+                counts = getattr(batch, "request_counts", None)
+                progress = f" ({counts.completed}/{counts.total})" if counts else ""
+                print(f"⏳ Batch {state['stage']} {batch.id}: {batch.status}{progress}", flush=True)
+                if not wait:
+                    return []
+                time.sleep(BLOG_BATCH_POLL_SEC)
+                continue
+
+            # completed / expired / cancelled / failed — wyniki częściowe też się liczą
+            results = _read_results(batch) if batch.status != "failed" else {}
+            if batch.status != "completed":
+                print(f"⚠️ Batch {batch.id}: {batch.status}, udanych odpowiedzi: {len(results)}", flush=True)
+        results = {**state.get("cached", {}), **results}
+
+        if state["stage"] == "research":
+            state = _start_articles(state, results)
+            _save_state(state)
+            if state is None:
+                return []
+            continue
+
+        outputs = _finish(state, results)
+        bg.mark_generated(outputs, topics_path)
+        _save_state(None)
+        print(f"✅ Batch zakończony: {len(outputs)} artykułów", flush=True)
+        return list(outputs.values())
@@ -5,6 +5,10 @@ import json
 from pathlib import Path
 from dotenv import load_dotenv
 
+from image_postprocess import responsive_attrs, transcode
+from llm_cache import cache_key, llm_cache
+from stage_graph import run_stages
+
 try:
     from openai import OpenAI
 except Exception:
@@ -15,7 +19,9 @@ except Exception:
 # ─────────────────────────────────────────────
 load_dotenv("bot.env")
 OPENAI_API_KEY = (os.getenv("OPENAI_API_KEY") or "").strip()
-client = OpenAI(api_key=OPENAI_API_KEY) if (OpenAI and OPENAI_API_KEY) else None
+# OPENAI_BASE_URL: np. lokalny serwer zastępczy (batch_standin_server.py) do testów --batch
+OPENAI_BASE_URL = (os.getenv("OPENAI_BASE_URL") or "").strip() or None
+client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL) if (OpenAI and OPENAI_API_KEY) else None
 
 OUTPUT_DIR = Path("output_blog")
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -37,10 +43,24 @@ GENESMANAGER_LINKS = [
 # ─────────────────────────────────────────────
 # HELPERS
 # ─────────────────────────────────────────────
-def _call_openai(messages, use_primary=True) -> str:
+def _models(use_primary=True) -> list[str]:
+    return [PRIMARY_MODEL, FALLBACK_MODEL] if use_primary else [FALLBACK_MODEL]
+
+def _cache_key(messages, use_primary=True) -> str:
+    return cache_key(_models(use_primary), messages, {"fallback_temperature": 0.2})
+
+def _call_openai(messages, use_primary=True, stage=None) -> str:
+    """stage (h1/image_meta/research/article) włącza cache odpowiedzi z TTL tego etapu."""
+    models = _models(use_primary)
+    key = _cache_key(messages, use_primary) if (llm_cache and stage) else None
+    if key:
+        cached = llm_cache.get(stage, key)
+        if cached:
+            print(f"💾 Cache LLM: {stage}", flush=True)
+            return cached
+
     if client is None:
         raise RuntimeError("Brak klienta OpenAI")
-    models = [PRIMARY_MODEL, FALLBACK_MODEL] if use_primary else [FALLBACK_MODEL]
     last_err = None
     for model in models:
         try:
@@ -50,6 +70,8 @@ def _call_openai(messages, use_primary=True) -> str:
             resp = client.chat.completions.create(**kwargs)
             result = (resp.choices[0].message.content or "").strip()
             if result:
+                if key:
+                    llm_cache.put(stage, key, result, model)
                 return result
         except Exception as e:
             print(f"⚠️ Model {model} error: {e}")
@@ -276,66 +298,46 @@ def _generate_image_png(description: str, out_path: Path) -> bool:
 
 
 # ─────────────────────────────────────────────
-# MAIN — generuj jeden artykuł z tematu
+# WIADOMOŚCI DLA ETAPÓW (wspólne dla trybu synchronicznego i --batch)
 # ─────────────────────────────────────────────
-def generate_blog_post(topic: dict) -> Path:
-    """
-    Przyjmuje słownik tematu z topics.json.
-    Zwraca ścieżkę do wygenerowanego pliku .txt z HTML.
-    """
-    title       = topic["title"]
-    angle       = topic.get("angle", "")
-    art_type    = topic.get("type", "cluster")  # "pillar" | "cluster"
-    service_cta = topic.get("service_cta") or ""
-    topic_id    = topic.get("id", 0)
-
-    print(f"\n📝 [{art_type.upper()}] {title}", flush=True)
-
-    # ── ETAP 1: OBRAZ ──
-    print("  🖼️  Generuję obraz...", flush=True)
-    img_meta_raw = _call_openai([
+def _image_meta_messages(title: str) -> list[dict]:
+    return [
         {"role": "system", "content": "Jesteś specjalistą od zdjęć stockowych."},
         {"role": "user",   "content": _image_prompt(title)},
-    ], use_primary=False)
-    img_desc, img_alt = _parse_image_meta(img_meta_raw)
+    ]
 
-    img_name = f"{topic_id:03d}_{_safe_filename(title, 50)}.png"
-    img_path = IMAGES_DIR / img_name
-    try:
-        ok = _generate_image_png(img_desc, img_path)
-        if not ok:
-            img_path = Path("")
-    except Exception as e:
-        print(f"  ⚠️ Błąd obrazu: {e}", flush=True)
-        img_path = Path("")
-
-    # ── ETAP 2: RESEARCH ──
-    print("  🔍 Research...", flush=True)
-    research = _call_openai([
+def _research_messages(title: str, angle: str) -> list[dict]:
+    return [
         {"role": "system", "content": "Jesteś ekspertem zarządzania placówkami medycznymi w Polsce."},
         {"role": "user",   "content": _research_prompt(title, angle)},
-    ], use_primary=True)
-    research = _clean(research)
+    ]
 
-    # ── ETAP 3: ARTYKUŁ ──
-    print("  ✍️  Generuję artykuł...", flush=True)
-    if art_type == "pillar":
+def _article_messages(topic: dict, research: str) -> list[dict]:
+    title       = topic["title"]
+    service_cta = topic.get("service_cta") or ""
+    if topic.get("type", "cluster") == "pillar":
         prompt = _pillar_prompt(title, service_cta, research)
     else:
         prompt = _cluster_prompt(title, service_cta, research)
-
-    html = _call_openai([
+    return [
         {"role": "system", "content": "Piszesz po polsku. Zwracasz wyłącznie HTML."},
         {"role": "user",   "content": prompt},
-    ], use_primary=True)
+    ]
+
+def _clean_article(html: str) -> str:
     html = _clean(html)
-    html = re.sub(r"<h1[^>]*>.*?</h1>\s*", "", html, flags=re.I | re.S).strip()
+    return re.sub(r"<h1[^>]*>.*?</h1>\s*", "", html, flags=re.I | re.S).strip()
 
-    # ── SKŁADANIE PLIKU ──
+def _image_name(topic: dict) -> str:
+    return f"{topic.get('id', 0):03d}_{_safe_filename(topic['title'], 50)}.png"
+
+def _assemble_post(topic: dict, img_path: Path, img_alt: str, html: str) -> Path:
+    title = topic["title"]
+    img_path, variants = transcode(img_path)
     img_tag = (
-        f'<img src="images/{img_name}" alt="{_escape_html(img_alt)}" '
+        f'<img src="images/{img_path.name}"{responsive_attrs(variants)} alt="{_escape_html(img_alt)}" '
         f'loading="lazy" style="max-width:100%;height:auto;margin:16px 0 24px 0;" />\n'
-        if img_path.exists() else ""
+        if img_path.is_file() else ""   # Path("") = brak obrazu (exists() byłoby True dla ".")
     )
 
     final_html = (
@@ -344,22 +346,78 @@ def generate_blog_post(topic: dict) -> Path:
         f"{html}"
     )
 
-    out_path = OUTPUT_DIR / f"{topic_id:03d}_{_safe_filename(title, 60)}.txt"
+    out_path = OUTPUT_DIR / f"{topic.get('id', 0):03d}_{_safe_filename(title, 60)}.txt"
     out_path.write_text(final_html, encoding="utf-8")
     print(f"  ✅ Zapisano: {out_path.name}", flush=True)
     return out_path
 
 
+# ─────────────────────────────────────────────
+# MAIN — generuj jeden artykuł z tematu
+# ─────────────────────────────────────────────
+def generate_blog_post(topic: dict) -> Path:
+    """
+    Przyjmuje słownik tematu z topics.json.
+    Zwraca ścieżkę do wygenerowanego pliku .txt z HTML.
+    """
+    title       = topic["title"]
+    angle       = topic.get("angle", "")
+    art_type    = topic.get("type", "cluster")  # "pillar" | "cluster"
+
+    print(f"\n📝 [{art_type.upper()}] {title}", flush=True)
+
+    # ── ETAP 1: OBRAZ (meta → PNG) ──
+    def stage_image_meta():
+        print("  🖼️  Generuję obraz...", flush=True)
+        img_meta_raw = _call_openai(_image_meta_messages(title), use_primary=False, stage="image_meta")
+        return _parse_image_meta(img_meta_raw)
+
+    def stage_image(image_meta):
+        img_desc, _ = image_meta
+        img_path = IMAGES_DIR / _image_name(topic)
+        try:
+            ok = _generate_image_png(img_desc, img_path)
+            if not ok:
+                img_path = Path("")
+        except Exception as e:
+            print(f"  ⚠️ Błąd obrazu: {e}", flush=True)
+            img_path = Path("")
+        return img_path
+
+    # ── ETAP 2: RESEARCH (równolegle z obrazem) ──
+    def stage_research():
+        print("  🔍 Research...", flush=True)
+        research = _call_openai(_research_messages(title, angle), use_primary=True, stage="research")
+        return _clean(research)
+
+    # ── ETAP 3: ARTYKUŁ (czeka tylko na research) ──
+    def stage_article(research):
+        print("  ✍️  Generuję artykuł...", flush=True)
+        html = _call_openai(_article_messages(topic, research), use_primary=True, stage="article")
+        return _clean_article(html)
+
+    done = run_stages({
+        "image_meta": ((), stage_image_meta),
+        "image":      (("image_meta",), stage_image),
+        "research":   ((), stage_research),
+        "article":    (("research",), stage_article),
+    })
+    _, img_alt = done["image_meta"]
+
+    # ── SKŁADANIE PLIKU ──
+    return _assemble_post(topic, done["image"], img_alt, done["article"])
+
+
 # ─────────────────────────────────────────────
 # WYBÓR TEMATU Z topics.json
 # ─────────────────────────────────────────────
 def pick_next_topic(topics_path: Path = Path("topics.json")) -> dict | None:
     """
-    Zwraca następny niepublikowany temat.
+    Zwraca następny niepublikowany (i niewygenerowany wcześniej partią) temat.
     Priorytet: pillar przed cluster, potem priority ASC.
     """
     topics = json.loads(topics_path.read_text(encoding="utf-8"))
-    candidates = [t for t in topics if not t.get("published") and not t.get("failed")]
+    candidates = [t for t in topics if not (t.get("published") or t.get("failed") or t.get("generated"))]
     if not candidates:
         return None
     # pillar przed cluster
@@ -377,6 +435,19 @@ def mark_published(topic_id: int, topics_path: Path = Path("topics.json")) -> No
     topics_path.write_text(json.dumps(topics, ensure_ascii=False, indent=2), encoding="utf-8")
 
 
+def mark_generated(outputs: dict, topics_path: Path = Path("topics.json")) -> None:
+    """{id tematu: plik wyjściowy} — tryb wsadowy nie wyśle tych tematów ponownie."""
+    from datetime import date
+    topics = json.loads(topics_path.read_text(encoding="utf-8"))
+    for t in topics:
+        out = outputs.get(str(t["id"]))
+        if out:
+            t["generated"] = True
+            t["generated_date"] = date.today().isoformat()
+            t["output"] = str(out)
+    topics_path.write_text(json.dumps(topics, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
 def mark_failed(topic_id: int, topics_path: Path = Path("topics.json")) -> None:
     topics = json.loads(topics_path.read_text(encoding="utf-8"))
     for t in topics:
@@ -386,9 +457,22 @@ def mark_failed(topic_id: int, topics_path: Path = Path("topics.json")) -> None:
 
 
 # ─────────────────────────────────────────────
-# CLI — test jednego tematu
+# CLI — test jednego tematu / --batch: cały backlog przez Batch API
 # ─────────────────────────────────────────────
 if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--batch", action="store_true", help="wszystkie oczekujące tematy przez OpenAI Batch API")
+    ap.add_argument("--wait", action="store_true", help="z --batch: czekaj na zakończenie obu etapów")
+    ap.add_argument("--limit", type=int, default=0, help="z --batch: maks. liczba tematów w partii")
+    args = ap.parse_args()
+
+    if args.batch:
+        from blog_batch import run_batch
+        for out in run_batch(limit=args.limit or None, wait=args.wait):
+            print(f"Gotowe: {out}")
+        raise SystemExit(0)
+
     topic = pick_next_topic()
     if not topic:
         print("Brak tematów do wygenerowania.")
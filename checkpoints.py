@@ -0,0 +1,183 @@
+"""
+Checkpointy generacji: ukończone etapy artykułu (H1, meta obrazu, obraz, research, artykuł)
+zapisywane per URL źródła. Ponowny run po awarii (np. timeout GPT-5 na etapie artykułu)
+zaczyna od pierwszego brakującego etapu.
+
+Katalog leży poza output_posts/, więc czyszczenie katalogu wyjściowego go nie rusza;
+checkpoint artykułu jest usuwany po udanej publikacji w WP. Po GEN_PUBLISH_ATTEMPTS
+odrzuconych publikacjach artykuł traci pierwszeństwo (checkpoint zostaje jako cache etapów).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from diskstore import write_json_atomic
+from urlnorm import normalize_url
+
+GEN_CHECKPOINT_DIR = os.getenv("GEN_CHECKPOINT_DIR", ".gen_checkpoints").strip()   # pusty = wyłączone
+GEN_CHECKPOINT_DAYS = float(os.getenv("GEN_CHECKPOINT_DAYS", "7"))
+GEN_PUBLISH_ATTEMPTS = max(1, int(os.getenv("GEN_PUBLISH_ATTEMPTS", "3")))
+
+_IMAGE_FILE = "image.png"
+
+
+class Checkpoint:
+    """Stan jednego artykułu: state.json (etapy) + image.png. Zapis atomowy, bezpieczny dla wątków DAG."""
+
+    def __init__(self, root: Path, article: dict):
+        self.root = root
+        self._lock = threading.Lock()
+        self.state = {"article": article, "stages": {}, "publish_failures": 0, "updated": time.time()}
+        try:
+            saved = json.loads((root / "state.json").read_text(encoding="utf-8"))
+            self.state["stages"] = saved.get("stages", {})
+            self.state["publish_failures"] = saved.get("publish_failures", 0)
+            self.state["updated"] = saved.get("updated", self.state["updated"])
+        except (OSError, ValueError):
+            pass
+
+    @property
+    def image_path(self) -> Path:
+        return self.root / _IMAGE_FILE
+
+    def get(self, stage: str):
+        return self.state["stages"].get(stage)
+
+    def put(self, stage: str, value, touch: bool = True):
+        """touch=False: zapis bez odświeżania "updated" (np. nazwa pliku wyjściowego przy wznowieniu
+        — ponowne próby nie mogą przedłużać życia checkpointu)."""
+        with self._lock:
+            if self.state["stages"].get(stage) == value:
+                return
+            self.state["stages"][stage] = value
+            if touch:
+                self.state["updated"] = time.time()
+            self._save(stage)
+
+    def publish_failed(self) -> int:
+        with self._lock:
+            self.state["publish_failures"] = self.state.get("publish_failures", 0) + 1
+            self._save("publish_failures")
+            return self.state["publish_failures"]
+
+    def _save(self, what: str):
+        # "updated" odświeża tylko put() z nowym wynikiem etapu — nieudane publikacje i wznowienia nie
+        try:
+            write_json_atomic(self.root / "state.json", self.state)
+        except OSError as e:
+            print(f"⚠️ Checkpoint zapis ({what}): {e}", flush=True)
+
+    def run(self, stage: str, fn, *args, **kwargs):
+        """Zwraca zapisany wynik etapu albo liczy go i zapisuje."""
+        done = self.get(stage)
+        if done is not None:
+            print(f"♻️ Checkpoint: pomijam etap {stage}", flush=True)
+            return done
+        result = fn(*args, **kwargs)
+        self.put(stage, result)
+        return result
+
+    def restore_image(self, out_path: Path) -> bool:
+        if not self.image_path.exists():
+            return False
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(self.image_path, out_path)
+        return True
+
+    def save_image(self, src_path: Path):
+        if src_path.exists():
+            self.root.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(src_path, self.image_path)
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+class _NullCheckpoint(Checkpoint):
+    """Checkpointy wyłączone: wszystko liczone od nowa, nic nie jest zapisywane."""
+
+    def __init__(self, article: dict):
+        self.state = {"article": article, "stages": {}}
+
+    @property
+    def image_path(self) -> Path:
+        return Path(os.devnull)
+
+    def put(self, stage: str, value, touch: bool = True):
+        pass
+
+    def publish_failed(self) -> int:
+        return 0
+
+    def restore_image(self, out_path: Path) -> bool:
+        return False
+
+    def save_image(self, src_path: Path):
+        pass
+
+    def clear(self):
+        pass
+
+
+def _article_key(article: dict) -> str:
+    ident = normalize_url(article.get("url") or "") or (article.get("title") or "").strip()
+    return hashlib.sha1(ident.encode("utf-8")).hexdigest()[:16]
+
+
+def open_checkpoint(article: dict) -> Checkpoint:
+    if not GEN_CHECKPOINT_DIR:
+        return _NullCheckpoint(article)
+    return Checkpoint(Path(GEN_CHECKPOINT_DIR) / _article_key(article), article)
+
+
+def clear_for_output(filename: str):
+    """Po udanej publikacji: usuń checkpoint artykułu, z którego powstał plik wyjściowy."""
+    for cp in _iter_checkpoints():
+        if cp.get("output") == filename:
+            cp.clear()
+
+
+def record_publish_failure(filename: str):
+    """Po odrzuconej publikacji: licznik prób w checkpoincie artykułu, z którego powstał plik."""
+    for cp in _iter_checkpoints():
+        if cp.get("output") != filename:
+            continue
+        failures = cp.publish_failed()
+        if failures >= GEN_PUBLISH_ATTEMPTS:
+            title = (cp.state.get("article") or {}).get("title", "")[:90]
+            print(f"⏬ {failures}× odrzucona publikacja — bez pierwszeństwa: {title}", flush=True)
+
+
+def pending_articles() -> list[dict]:
+    """Artykuły z rozpoczętą, nieopublikowaną generacją (najświeższe pierwsze); przeterminowane są usuwane,
+    a te z GEN_PUBLISH_ATTEMPTS odrzuconymi publikacjami pomijane."""
+    found = []
+    max_age = GEN_CHECKPOINT_DAYS * 86400
+    for cp in _iter_checkpoints():
+        if time.time() - cp.state.get("updated", 0) > max_age:
+            cp.clear()
+            continue
+        if cp.state.get("publish_failures", 0) >= GEN_PUBLISH_ATTEMPTS:
+            continue
+        found.append(cp.state)
+    found.sort(key=lambda st: st.get("updated", 0), reverse=True)
+    return [st["article"] for st in found if st.get("article")]
+
+
+def _iter_checkpoints():
+    root = Path(GEN_CHECKPOINT_DIR) if GEN_CHECKPOINT_DIR else None
+    if not root or not root.is_dir():
+        return
+    for state_file in root.glob("*/state.json"):
+        try:
+            state = json.loads(state_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        cp = Checkpoint(state_file.parent, state.get("article") or {})
+        cp.state["updated"] = state.get("updated", 0)
+        yield cp
@@ -0,0 +1,71 @@
+"""
+Wspólny zapis na dysk dla cache'y i plików stanu (cache HTTP parsera, cache LLM, checkpointy,
+cache metadanych WP, stan crawla i trybu wsadowego bloga).
+
+write_json_atomic — tmp + os.replace: równoległy czytelnik albo awaria w trakcie zapisu
+nigdy nie zostawiają połowy pliku. JsonDirCache — jeden plik JSON na klucz, LRU po mtime.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+
+def write_json_atomic(path: Path, obj, indent: int | None = None):
+    """Zapisuje obj jako JSON; OSError zostaje dla wołającego (każdy ma własny komunikat)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")   # osobny tmp na wątek
+    try:
+        tmp.write_text(json.dumps(obj, ensure_ascii=False, indent=indent), encoding="utf-8")
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+class JsonDirCache:
+    """Jeden plik JSON na klucz; LRU po mtime (trafienie odświeża mtime), limit katalogu w bajtach."""
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def _read(self, key: str) -> dict | None:
+        try:
+            return json.loads(self._path(key).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _touch(self, key: str):
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def _write(self, key: str, entry: dict):
+        write_json_atomic(self._path(key), entry)
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            files = []
+            for f in self.root.glob("*.json"):
+                try:
+                    st = f.stat()
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, f))
+            total = sum(size for _, size, _ in files)
+            for _, size, f in sorted(files, key=lambda x: x[0]):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    f.unlink()
+                    total -= size
+                except OSError:
+                    pass
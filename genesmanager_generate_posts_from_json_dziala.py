@@ -2,9 +2,16 @@ import os
 import re
 import time
 import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
 
+from checkpoints import open_checkpoint
+from image_postprocess import responsive_attrs, transcode
+from llm_cache import cache_key, llm_cache
+from stage_graph import run_stages
+
 try:
     from openai import OpenAI
 except Exception:
@@ -30,23 +37,55 @@ FALLBACK_MODEL = "gpt-4o-mini"
 IMAGE_MODEL = "gpt-image-1"
 IMAGE_SIZE = "1024x1024"
 
+# Równoległa generacja: ile artykułów naraz i limit zapytań do OpenAI na minutę (0 = bez limitu)
+GEN_CONCURRENCY = max(1, int(os.getenv("GEN_CONCURRENCY", "2")))
+OPENAI_RPM = max(0, int(os.getenv("OPENAI_RPM", "0")))
+
 # ─────────────────────────────────────────────
 # HELPERS
 # ─────────────────────────────────────────────
-def _call_openai(messages, use_primary=True) -> str:
+_rate_lock = threading.Lock()
+_rate_next = 0.0
+
+
+def _rate_limit():
+    """Rozkłada zapytania równomiernie: co najmniej 60/OPENAI_RPM s między startami."""
+    global _rate_next
+    if not OPENAI_RPM:
+        return
+    with _rate_lock:
+        now = time.monotonic()
+        start = max(now, _rate_next)
+        _rate_next = start + 60.0 / OPENAI_RPM
+    if start > now:
+        time.sleep(start - now)
+
+
+def _call_openai(messages, use_primary=True, stage=None) -> str:
+    """stage (h1/image_meta/research/article) włącza cache odpowiedzi z TTL tego etapu."""
+    models = [PRIMARY_MODEL, FALLBACK_MODEL] if use_primary else [FALLBACK_MODEL]
+    key = cache_key(models, messages, {"fallback_temperature": 0.2}) if (llm_cache and stage) else None
+    if key:
+        cached = llm_cache.get(stage, key)
+        if cached:
+            print(f"💾 Cache LLM: {stage}", flush=True)
+            return cached
+
     if client is None:
         raise RuntimeError("Brak klienta OpenAI")
 
-    models = [PRIMARY_MODEL, FALLBACK_MODEL] if use_primary else [FALLBACK_MODEL]
     last_err = None
     for model in models:
         try:
             kwargs = {"model": model, "messages": messages}
             if model == FALLBACK_MODEL:
                 kwargs["temperature"] = 0.2
+            _rate_limit()
             resp = client.chat.completions.create(**kwargs)
             result = (resp.choices[0].message.content or "").strip()
             if result:
+                if key:
+                    llm_cache.put(stage, key, result, model)
                 return result
         except Exception as e:
             print(f"⚠️ Model {model} error: {e}")
@@ -114,6 +153,7 @@ def _generate_image_png(image_description: str, out_path: Path) -> bool:
         "Wygląd jak prawdziwa fotografia, bez sztucznego 'AI look'."
     )
 
+    _rate_limit()
     resp = client.images.generate(
         model=IMAGE_MODEL,
         prompt=prompt,
@@ -169,7 +209,8 @@ def _generate_h1(source_title: str, lead: str, url: str) -> str:
             {"role": "system", "content": "Jesteś redaktorem medycznym. Tworzysz zwięzłe, trafne nagłówki."},
             {"role": "user", "content": _h1_prompt(source_title, lead, url)}
         ],
-        use_primary=False
+        use_primary=False,
+        stage="h1"
     )
     txt = _clean(txt)
     txt = re.sub(r"[\"“”]", "", txt).strip()
@@ -279,77 +320,121 @@ Zwróć wyłącznie HTML.
 # ─────────────────────────────────────────────
 # MAIN
 # ─────────────────────────────────────────────
-def generate_posts(articles):
-    for idx, art in enumerate(articles, 1):
-        source_title = (art.get("title") or f"Aktualność {idx}").strip()
-        lead = (art.get("lead") or "").strip()
-        url = (art.get("url") or "").strip()
-
-        # ✅ H1 do publikacji: generujemy redakcyjny, kontrolowany
-        h1_text = _generate_h1(source_title, lead, url)
-
-        # ── ETAP 0: FOTO META (opis + ALT) ──
+def _generate_one(idx: int, art: dict) -> Path:
+    source_title = (art.get("title") or f"Aktualność {idx}").strip()
+    lead = (art.get("lead") or "").strip()
+    url = (art.get("url") or "").strip()
+    cp = open_checkpoint(art)   # ukończone etapy z przerwanego runu są pomijane
+
+    # ✅ H1 do publikacji: generujemy redakcyjny, kontrolowany
+    def stage_h1():
+        return _generate_h1(source_title, lead, url)
+
+    # ── ETAP 0: FOTO META (opis + ALT) ──
+    def stage_image_meta(h1):
         img_meta_raw = _call_openai(
             [
                 {"role": "system", "content": "Jesteś specjalistą od zdjęć stockowych do artykułów branżowych."},
-                {"role": "user", "content": _image_prompt(h1_text)}
+                {"role": "user", "content": _image_prompt(h1)}
             ],
-            use_primary=True
+            use_primary=True,
+            stage="image_meta"
         )
-        img_desc, img_alt = _parse_image_meta(img_meta_raw)
-
-        # ── ETAP 0.5: GENERACJA OBRAZKA (PNG) ──
-        img_name = f"{idx:03d}_{_safe_filename(h1_text, 50)}.png"
-        img_path = IMAGES_DIR / img_name
-
+        return _parse_image_meta(img_meta_raw)
+
+    # ── ETAP 0.5: GENERACJA OBRAZKA (PNG) ──
+    def stage_image(h1, image_meta):
+        img_desc, _ = image_meta
+        img_path = IMAGES_DIR / f"{idx:03d}_{_safe_filename(h1, 50)}.png"
+        if cp.restore_image(img_path):
+            print("♻️ Checkpoint: obraz z poprzedniego runu", flush=True)
+            return img_path
         try:
             ok = _generate_image_png(img_desc, img_path)
-            if not ok:
-                print(f"⚠️ Nie udało się wygenerować obrazu dla: {h1_text}", flush=True)
+            if ok:
+                cp.save_image(img_path)
+            else:
+                print(f"⚠️ Nie udało się wygenerować obrazu dla: {h1}", flush=True)
         except Exception as e:
-            print(f"⚠️ Błąd generowania obrazu dla '{h1_text}': {e}", flush=True)
+            print(f"⚠️ Błąd generowania obrazu dla '{h1}': {e}", flush=True)
+        return img_path
 
-        # ── ETAP 1: RESEARCH (na podstawie tytułu źródła) ──
+    # ── ETAP 1: RESEARCH (na podstawie tytułu źródła — nie czeka na H1 ani obraz) ──
+    def stage_research():
         research = _call_openai(
             [
                 {"role": "system", "content": "Jesteś analitykiem ochrony zdrowia."},
                 {"role": "user", "content": _research_prompt(source_title, url)}
             ],
-            use_primary=True
+            use_primary=True,
+            stage="research"
         )
-        research = _clean(research)
+        return _clean(research)
 
-        # ── ETAP 2: ARTYKUŁ ──
+    # ── ETAP 2: ARTYKUŁ (czeka tylko na research) ──
+    def stage_article(research):
         html = _call_openai(
             [
                 {"role": "system", "content": "Piszesz po polsku. Zwracasz wyłącznie HTML."},
                 {"role": "user", "content": _article_prompt(source_title, lead, url, research)}
             ],
-            use_primary=True
+            use_primary=True,
+            stage="article"
         )
         html = _clean(html)
-
         # usuń ewentualny H1 z treści jeśli model go mimo wszystko wstawi
-        html = re.sub(r"<h1[^>]*>.*?</h1>\s*", "", html, flags=re.I | re.S).strip()
-
-        # obrazek pod H1 (pipeline wrzuci do WP Media i podmieni na URL)
-        img_tag = (
-            f'<img src="images/{img_name}" alt="{_escape_html(img_alt)}" loading="lazy" '
-            f'style="max-width:100%;height:auto;margin:16px 0 24px 0;" />\n'
-            if img_path.exists() else
-            ""
-        )
+        return re.sub(r"<h1[^>]*>.*?</h1>\s*", "", html, flags=re.I | re.S).strip()
+
+    done = run_stages({
+        "h1": ((), lambda: cp.run("h1", stage_h1)),
+        "image_meta": (("h1",), lambda h1: cp.run("image_meta", stage_image_meta, h1)),
+        "image": (("h1", "image_meta"), stage_image),
+        "research": ((), lambda: cp.run("research", stage_research)),
+        "article": (("research",), lambda research: cp.run("article", stage_article, research)),
+    })
+    h1_text, html = done["h1"], done["article"]
+    _, img_alt = done["image_meta"]
+    # PNG → WebP/AVIF + warianty szerokości (bez Pillow zostaje PNG)
+    img_path, variants = transcode(done["image"])
+    img_name = img_path.name
+
+    # obrazek pod H1 (pipeline wrzuci do WP Media i podmieni na URL, także w srcset)
+    img_tag = (
+        f'<img src="images/{img_name}"{responsive_attrs(variants)} alt="{_escape_html(img_alt)}" loading="lazy" '
+        f'style="max-width:100%;height:auto;margin:16px 0 24px 0;" />\n'
+        if img_path.exists() else
+        ""
+    )
 
-        # ✅ Final: H1 jest pierwszym elementem w pliku
-        final_html = (
-            f"<h1>{_escape_html(h1_text)}</h1>\n"
-            f"{img_tag}"
-            f"{html}"
-        )
+    # ✅ Final: H1 jest pierwszym elementem w pliku
+    final_html = (
+        f"<h1>{_escape_html(h1_text)}</h1>\n"
+        f"{img_tag}"
+        f"{html}"
+    )
 
-        # plik: krótki slug, ale H1 w środku jest pełny (pipeline bierze title z H1)
-        filename = OUTPUT_DIR / f"{idx:03d}_{_safe_filename(h1_text, 60)}.txt"
-        filename.write_text(final_html, encoding="utf-8")
+    # plik: krótki slug, ale H1 w środku jest pełny (pipeline bierze title z H1)
+    filename = OUTPUT_DIR / f"{idx:03d}_{_safe_filename(h1_text, 60)}.txt"
+    filename.write_text(final_html, encoding="utf-8")
+    # pipeline czyści checkpoint po publikacji tego pliku; bez odświeżania wieku checkpointu
+    cp.put("output", filename.name, touch=False)
 
-        print(f"✅ Wygenerowano: {filename.name}", flush=True)
+    print(f"✅ Wygenerowano: {filename.name}", flush=True)
+    return filename
 
+
+def generate_posts(articles):
+    """Artykuły generowane równolegle (GEN_CONCURRENCY); idx = pozycja na liście, więc nazwy plików są stałe."""
+    articles = list(articles)
+    workers = min(GEN_CONCURRENCY, len(articles)) or 1
+    errors = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_generate_one, idx, art) for idx, art in enumerate(articles, 1)]
+        for idx, fut in enumerate(futures, 1):
+            try:
+                fut.result()
+            except Exception as e:
+                print(f"❌ Generacja artykułu {idx} nie powiodła się: {e}", flush=True)
+                errors.append(e)
+    if errors:
+        raise errors[0]
@@ -5,13 +5,19 @@ import os
 import json
 import time
 import subprocess
-import requests
+from concurrent.futures import ThreadPoolExecutor
 import shutil
 import re
+import sys
+import hashlib
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from pathlib import Path
 
+from diskstore import write_json_atomic
+from urlnorm import normalize_url
+from wp_client import wp
+
 try:
     from openai import OpenAI
 except Exception:
@@ -24,14 +30,7 @@ load_dotenv("bot.env")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
 client = OpenAI(api_key=OPENAI_API_KEY) if (OpenAI and OPENAI_API_KEY) else None
 
-WP_URL = (os.getenv("WP_URL") or "").rstrip("/")
-WP_USER = os.getenv("WP_USER", "")
-WP_APP_PASSWORD = os.getenv("WP_APP_PASSWORD", "")
-API_ENDPOINT = f"{WP_URL}/wp-json/wp/v2/posts" if WP_URL else ""
-AUTH = (WP_USER, WP_APP_PASSWORD) if (WP_USER and WP_APP_PASSWORD) else None
-
-MEDIA_ENDPOINT = f"{WP_URL}/wp-json/wp/v2/media" if WP_URL else ""
-CATS_ENDPOINT  = f"{WP_URL}/wp-json/wp/v2/categories" if WP_URL else ""
+# WP_URL / WP_USER / WP_APP_PASSWORD czyta wp_client (wspólna sesja, retry, strategia wysyłki)
 
 DNI_WSTECZ = 3
 CUTOFF_DATE = datetime.today() - timedelta(days=DNI_WSTECZ)
@@ -39,46 +38,101 @@ CUTOFF_DATE = datetime.today() - timedelta(days=DNI_WSTECZ)
 ARTICLES_JSON_PATH = Path("all_articles_combined.json")
 POST_DIR = Path("output_posts")
 
+# Parser domyślnie w tym samym procesie; PARSER_SUBPROCESS=1 → osobny interpreter + JSON
+PARSER_SUBPROCESS = os.getenv("PARSER_SUBPROCESS", "0").strip() == "1"
+# PIPELINE_STREAMING=1 → generacja startuje, gdy tylko są tematy priorytetowe (crawl trwa dalej)
+PIPELINE_STREAMING = os.getenv("PIPELINE_STREAMING", "0").strip() == "1"
+PRIO_AUTOPICK = 6
+
+# Upload obrazów: ile naraz (jedna pula połączeń keep-alive do WP)
+WP_UPLOAD_WORKERS = max(1, int(os.getenv("WP_UPLOAD_WORKERS", "4")))
+
 # ─────────────────────────────────────────────
-# ✅ DEDUPE: sprawdzamy WP REST API (bez pliku lokalnego)
-#    Szukamy source URL w treści ostatnich 30 postów.
-#    Render ma efemeryczny dysk — plik JSON byłby czyszczony przy każdym deployu.
+# ✅ DEDUPE: indeks opublikowanych treści z WP REST API
+#    Zbiór: znormalizowane URL-e z treści postów (sekcja „Źródło”). Tytuły się nie nadają:
+#    H1 posta jest generowany inaczej niż tytuł źródła, więc porównanie nigdy nie trafia.
+#    Budowany stronicowaniem po wszystkich postach (_fields ograniczone),
+#    potem odświeżany przyrostowo przez modified_after.
+#    Plik to tylko cache — brak pliku (efemeryczny dysk Render) = pełna przebudowa z WP.
+#    WP_DEDUPE_INDEX_PATH na persistent disk → kolejne runy pobierają tylko zmiany.
 # ─────────────────────────────────────────────
-_wp_recent_contents: list[str] | None = None   # cache na czas jednego uruchomienia
+WP_DEDUPE_INDEX_PATH = Path(os.getenv("WP_DEDUPE_INDEX_PATH", "wp_dedupe_index.json"))
+
+_wp_index: dict | None = None   # {"urls": set, "modified_after": str}
 
 
-def _fetch_recent_wp_contents() -> list[str]:
-    global _wp_recent_contents
-    if _wp_recent_contents is not None:
-        return _wp_recent_contents
-    if not (API_ENDPOINT and AUTH):
-        _wp_recent_contents = []
-        return _wp_recent_contents
+def _load_wp_index() -> dict:
     try:
-        resp = requests.get(
-            API_ENDPOINT,
-            params={"per_page": 30, "status": "publish", "orderby": "date",
-                    "order": "desc", "_fields": "content"},
-            auth=AUTH, timeout=15
-        )
-        if resp.status_code == 200:
-            _wp_recent_contents = [
-                p.get("content", {}).get("rendered", "") for p in resp.json()
-            ]
-        else:
-            _wp_recent_contents = []
+        raw = json.loads(WP_DEDUPE_INDEX_PATH.read_text(encoding="utf-8"))
+        return {"urls": set(raw.get("urls", [])),
+                "modified_after": raw.get("modified_after", "")}
+    except (OSError, ValueError):
+        return {"urls": set(), "modified_after": ""}
+
+
+def _save_wp_index(index: dict):
+    try:
+        # atomowo — przerwany zapis nie może zepsuć indeksu (= pełna przebudowa z WP)
+        write_json_atomic(WP_DEDUPE_INDEX_PATH, {
+            "urls": sorted(index["urls"]),
+            "modified_after": index["modified_after"],
+        })
+    except OSError as e:
+        print(f"⚠️ Nie udało się zapisać indeksu dedupe: {e}")
+
+
+def _refresh_wp_index(index: dict) -> int:
+    """Dociąga posty zmienione po index['modified_after']; zwraca liczbę przetworzonych."""
+    params = {"per_page": 100, "status": "publish", "orderby": "modified", "order": "asc",
+              "_fields": "id,content,modified"}
+    if index["modified_after"]:
+        params["modified_after"] = index["modified_after"]
+    newest = index["modified_after"]
+    count = 0
+    page, total_pages = 1, 1
+    while page <= total_pages:
+        resp = wp.get("posts", params={**params, "page": page})
+        if resp.status_code != 200:
+            raise RuntimeError(f"HTTP {resp.status_code} (strona {page})")
+        total_pages = int(resp.headers.get("X-WP-TotalPages", "1") or 1)
+        for post in resp.json():
+            content = (post.get("content") or {}).get("rendered", "")
+            for href in re.findall(r"""href=["']([^"']+)["']""", content):
+                key = normalize_url(href)
+                if key:
+                    index["urls"].add(key)
+            newest = max(newest, post.get("modified") or "")
+            count += 1
+        page += 1
+    index["modified_after"] = newest
+    return count
+
+
+def _get_wp_index() -> dict:
+    global _wp_index
+    if _wp_index is not None:
+        return _wp_index
+    _wp_index = _load_wp_index()
+    if not wp.configured:
+        return _wp_index
+    try:
+        n = _refresh_wp_index(_wp_index)
+        _save_wp_index(_wp_index)
+        print(f"🗂️ Indeks dedupe WP: +{n} postów, {len(_wp_index['urls'])} URL-i")
     except Exception as e:
-        print(f"⚠️ Nie udało się pobrać ostatnich postów WP: {e}")
-        _wp_recent_contents = []
-    return _wp_recent_contents
+        print(f"⚠️ Nie udało się odświeżyć indeksu dedupe WP: {e}")
+    return _wp_index
 
 
 def _source_url_published(source_url: str) -> bool:
-    """Zwraca True jeśli source URL pojawia się w treści jednego z ostatnich 30 postów."""
-    if not source_url:
-        return False
-    contents = _fetch_recent_wp_contents()
-    return any(source_url in c for c in contents)
+    """True jeśli (znormalizowany) source URL występuje w treści któregoś opublikowanego posta."""
+    key = normalize_url(source_url)
+    return bool(key) and key in _get_wp_index()["urls"]
+
+
+def _article_published(a: dict) -> bool:
+    # "duplicates" = ten sam temat z innych źródeł (klastrowanie w parserze)
+    return any(_source_url_published(u) for u in [a.get("url") or "", *a.get("duplicates", [])])
 
 
 def _key_for_article(a: dict) -> str:
@@ -86,37 +140,16 @@ def _key_for_article(a: dict) -> str:
 
 
 # ─────────────────────────────────────────────
-# ✅ Kategoria "Aktualności" — pobierz lub utwórz
+# ✅ Kategoria (domyślnie "Aktualności") — pobierz lub utwórz (ID w trwałym cache metadanych WP)
 # ─────────────────────────────────────────────
-_aktualnosci_cat_id: int | None = None
-
-
-def _get_aktualnosci_category_id() -> int:
-    global _aktualnosci_cat_id
-    if _aktualnosci_cat_id is not None:
-        return _aktualnosci_cat_id
-    if not (CATS_ENDPOINT and AUTH):
+def _get_category_id(name: str = "Aktualności") -> int:
+    if not (wp.configured and name):
         return 0
     try:
-        resp = requests.get(CATS_ENDPOINT,
-                            params={"search": "Aktualności", "per_page": 10},
-                            auth=AUTH, timeout=10)
-        if resp.status_code == 200:
-            for cat in resp.json():
-                if cat.get("name", "").strip().lower() in ("aktualności", "aktualnosci"):
-                    _aktualnosci_cat_id = cat["id"]
-                    return _aktualnosci_cat_id
-        # nie ma → utwórz
-        resp2 = requests.post(CATS_ENDPOINT, auth=AUTH,
-                              json={"name": "Aktualności"}, timeout=10)
-        if resp2.status_code == 201:
-            _aktualnosci_cat_id = resp2.json()["id"]
-            print(f"✅ Utworzono kategorię 'Aktualności' (ID {_aktualnosci_cat_id})")
-            return _aktualnosci_cat_id
+        return wp.term_id("categories", name)
     except Exception as e:
         print(f"⚠️ Błąd kategorii: {e}")
-    _aktualnosci_cat_id = 0
-    return 0
+        return 0
 
 
 # ─────────────────────────────────────────────
@@ -158,30 +191,77 @@ def _safe_lead(a):
 # ─────────────────────────────────────────────
 # ✅ PRIORYTET: kontraktowanie NFZ + dofinansowania (scoring + autowybór)
 # ─────────────────────────────────────────────
-PRIO_KEYWORDS = [
+# Grupy słów kluczowych: (nazwa, waga, wzorzec z rdzeniem — łapie odmianę).
+# Każda grupa liczy się raz na artykuł: 2 za słowo kluczowe, 3 za NFZ, plus premia +3
+# raz na rodzinę (PRIO_FAMILY_BONUS) — układ dawnej punktacji. Rdzenie łapią też odmiany,
+# których dawne dopasowanie podciągu nie widziało („Umowa z NFZ – aneks”: 5 → 7).
+PRIO_KEYWORD_GROUPS = [
     # kontraktowanie / konkursy / umowy
-    "konkurs", "postępowanie", "ogłoszenie postępownia", "kontrakty", "umowy", "aneks",
-    "świadczeniodawca", "zawarcie umowy", "warunki realizacji", "zarządzenie prezesa nfz",
-    "komunikat nfz", "sprawozdawczość", "rozliczenia", "korekty", "zwroty",
-    "wycena", "taryfy", "limity", "budżet", "stawki", "ryczałt",
+    ("konkurs", 2, r"konkurs\w*"),
+    ("postępowanie", 2, r"postępowa\w*"),
+    ("ogłoszenie postępowania", 2, r"ogłosze\w*\s+postęp\w*"),
+    ("kontrakty", 2, r"kontrakt\w*"),
+    ("zawarcie umowy", 2, r"zawar\w*\s+umow\w*"),
+    ("umowy", 2, r"umow\w*|umów"),
+    ("aneks", 2, r"aneks\w*"),
+    ("świadczeniodawca", 2, r"świadczeniodaw\w*"),
+    ("warunki realizacji", 2, r"warunk\w*\s+realizacji"),
+    ("zarządzenie prezesa nfz", 2, r"zarządzeni\w*\s+prezesa\s+nfz"),
+    ("komunikat nfz", 2, r"komunikat\w*\s+nfz"),
+    ("sprawozdawczość", 2, r"sprawozdawcz\w*"),
+    ("rozliczenia", 2, r"rozlicz\w*"),
+    ("korekty", 2, r"korekt\w*"),
+    ("zwroty", 2, r"zwrot\w*"),
+    ("wycena", 2, r"wycen\w*"),
+    ("taryfy", 2, r"taryf\w*"),
+    ("limity", 2, r"limit\w*"),
+    ("budżet", 2, r"budżet\w*"),
+    ("stawki", 2, r"stawk\w*|stawek"),
+    ("ryczałt", 2, r"ryczałt\w*"),
 
     # finansowanie / dofinansowania
-    "dofinansowania", "dotacje", "granty", "subwencje", "kpo", "fundusz", "środki",
-    "nabór", "program", "finansowanie", "refundacja",
+    ("dofinansowania", 2, r"dofinansowa\w*"),
+    ("dotacje", 2, r"dotacj\w*"),
+    ("granty", 2, r"grant\w*"),
+    ("subwencje", 2, r"subwencj\w*"),
+    ("kpo", 2, r"kpo\b"),
+    ("fundusz", 2, r"fundusz\w*"),
+    ("środki", 2, r"środk\w*|środek"),
+    ("nabór", 2, r"nab[oó]r\w*"),
+    ("program", 2, r"program\w*"),
+    ("finansowanie", 2, r"finansowa\w*"),
+    ("refundacja", 2, r"refundac\w*"),
+
+    ("nfz", 3, r"nfz\w*"),
+]
+PRIO_KEYWORDS = [name for name, _, _ in PRIO_KEYWORD_GROUPS]
+
+# (premia, grupy) — premia doliczana raz, niezależnie od liczby trafionych grup rodziny
+PRIO_FAMILY_BONUS = [
+    (3, {"konkurs", "postępowanie"}),
+    (3, {"dofinansowania", "dotacje", "kpo"}),
 ]
 
+# Jeden regex na wszystkie grupy; lookahead na każdej granicy słowa pozwala frazom
+# nachodzić na siebie („komunikat nfz” liczy też „nfz”).
+_PRIO_RE = re.compile(
+    r"\b(?=" + "|".join(f"(?P<g{i}>{pat})" for i, (_, _, pat) in enumerate(PRIO_KEYWORD_GROUPS)) + ")"
+)
+_PRIO_WEIGHTS = {f"g{i}": weight for i, (_, weight, _) in enumerate(PRIO_KEYWORD_GROUPS)}
+_PRIO_NAMES = {f"g{i}": name for i, (name, _, _) in enumerate(PRIO_KEYWORD_GROUPS)}
+
+
 def _prio_score(article: dict) -> int:
+    """Wynik liczony raz i zapamiętywany w rekordzie (klucz _prio)."""
+    cached = article.get("_prio")
+    if cached is not None:
+        return cached
     txt = f"{article.get('title','')} {article.get('lead','')}".lower()
-    score = 0
-    for kw in PRIO_KEYWORDS:
-        if kw in txt:
-            score += 2
-    if "nfz" in txt:
-        score += 3
-    if ("konkurs" in txt) or ("postępowan" in txt):
-        score += 3
-    if ("dofinansowan" in txt) or ("dotacj" in txt) or ("kpo" in txt):
-        score += 3
+    groups = {m.lastgroup for m in _PRIO_RE.finditer(txt)}
+    score = sum(_PRIO_WEIGHTS[g] for g in groups)
+    hit = {_PRIO_NAMES[g] for g in groups}
+    score += sum(bonus for bonus, family in PRIO_FAMILY_BONUS if hit & family)
+    article["_prio"] = score
     return score
 
 # ─────────────────────────────────────────────
@@ -219,8 +299,9 @@ def _parse_indices_from_gpt(content: str):
 # + priorytet kontraktowanie/dofinansowania
 # + dedupe po URL
 # ─────────────────────────────────────────────
-def pick_most_relevant_articles(all_articles, n=2, retries=2):
-    recent_articles = [a for a in all_articles if is_recent(a.get("date", ""))]
+def _prepare_candidates(articles, seen_keys: set | None = None):
+    """Aktualne, z uzupełnionym tytułem/leadem, jeszcze nieopublikowane w WP."""
+    recent_articles = [a for a in articles if is_recent(a.get("date", ""))]
 
     for a in recent_articles:
         if not (a.get("title") or "").strip():
@@ -228,9 +309,21 @@ def pick_most_relevant_articles(all_articles, n=2, retries=2):
         if not (a.get("lead") or "").strip():
             a["lead"] = _safe_lead(a) or a["title"]
 
-    # ✅ dedupe: sprawdzamy WP REST API zamiast lokalnego pliku
-    unpub = [a for a in recent_articles
-             if _key_for_article(a) and not _source_url_published(_key_for_article(a))]
+    # ✅ dedupe: indeks URL-i źródeł z opublikowanych postów WP
+    out = []
+    for a in recent_articles:
+        key = _key_for_article(a)
+        if not key or (seen_keys is not None and key in seen_keys):
+            continue
+        if seen_keys is not None:
+            seen_keys.add(key)
+        if not _article_published(a):
+            out.append(a)
+    return out
+
+
+def pick_most_relevant_articles(all_articles, n=2, retries=2):
+    unpub = _prepare_candidates(all_articles)
     if not unpub:
         return []
 
@@ -238,7 +331,7 @@ def pick_most_relevant_articles(all_articles, n=2, retries=2):
     unpub = sorted(unpub, key=_prio_score, reverse=True)
 
     # ✅ autowybór jeśli są tematy priorytetowe
-    prio = [a for a in unpub if _prio_score(a) >= 6]
+    prio = [a for a in unpub if _prio_score(a) >= PRIO_AUTOPICK]
     if len(prio) >= n:
         print("⭐ Priorytet: wykryto tematy kontraktowanie/dofinansowania – wybór bez GPT.")
         return prio[:n]
@@ -299,6 +392,7 @@ def pick_most_relevant_articles(all_articles, n=2, retries=2):
 # 🖊️ 5. Generowanie postów
 # ─────────────────────────────────────────────
 from genesmanager_generate_posts_from_json_dziala import generate_posts
+from checkpoints import clear_for_output, pending_articles, record_publish_failure
 
 # ─────────────────────────────────────────────
 # ✅ Tytuł z H1 z generatora + usuwanie H1 z treści (żeby nie dublować)
@@ -338,29 +432,63 @@ def _guess_mime(filename: str) -> str:
         return "image/jpeg"
     if fn.endswith(".webp"):
         return "image/webp"
+    if fn.endswith(".avif"):
+        return "image/avif"
     if fn.endswith(".gif"):
         return "image/gif"
     return "image/png"
 
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _find_media_by_hash(short_hash: str):
+    """Hash jest w nazwie pliku → w slugu/tytule załącznika, więc search go znajduje."""
+    try:
+        resp = wp.get("media", params={"search": short_hash, "per_page": 5,
+                                       "_fields": "id,source_url,slug"}, timeout=20)
+        if resp.status_code == 200:
+            for item in resp.json():
+                if short_hash in (item.get("slug") or "") or short_hash in (item.get("source_url") or ""):
+                    return item.get("source_url"), item.get("id")
+    except Exception as e:
+        print(f"⚠️ Wyszukiwanie media {short_hash}: {e}")
+    return None, None
+
+
 def _upload_media_to_wp(image_path: Path, title: str):
-    if not (MEDIA_ENDPOINT and AUTH):
+    if not wp.configured:
         return None, None
     if not image_path.exists():
         return None, None
 
+    # hash treści → (source_url, id): najpierw trwały cache metadanych, potem wyszukiwarka WP
+    short_hash = _file_sha256(image_path)[:12]
+    cached = wp.meta.get("media", short_hash)
+    if cached:
+        return tuple(cached)
+    source_url, media_id = _find_media_by_hash(short_hash)
+    if source_url:
+        print(f"♻️ Media już w WP ({short_hash}): {image_path.name}")
+        wp.meta.put("media", short_hash, [source_url, media_id])
+        return source_url, media_id
+
+    upload_name = f"{image_path.stem}-{short_hash}{image_path.suffix}"
     mime = _guess_mime(image_path.name)
     headers_media = {
-        "Accept": "application/json",
-        "Content-Disposition": f'attachment; filename="{image_path.name}"',
+        "Content-Disposition": f'attachment; filename="{upload_name}"',
         "Content-Type": mime,
-        "Cache-Control": "no-cache",
-        "Pragma": "no-cache",
-        "User-Agent": "GenesManager/1.0 (+requests)"
+        "Content-Length": str(image_path.stat().st_size),
     }
 
     try:
+        # obiekt pliku jako body → requests wysyła go strumieniowo, bez wczytywania całego PNG
         with image_path.open("rb") as f:
-            resp = requests.post(MEDIA_ENDPOINT, auth=AUTH, headers=headers_media, data=f.read(), timeout=60)
+            resp = wp.post("media", headers=headers_media, data=f, timeout=60)
     except Exception as e:
         print(f"❌ Upload media wyjątek {image_path.name}: {e}")
         return None, None
@@ -372,116 +500,103 @@ def _upload_media_to_wp(image_path: Path, title: str):
 
     try:
         data = resp.json()
+        wp.meta.put("media", short_hash, [data.get("source_url"), data.get("id")])
         return data.get("source_url"), data.get("id")
     except Exception:
         return None, None
 
-def _replace_local_images_with_wp_urls(body_html: str, title: str):
+def _replace_local_images_with_wp_urls(body_html: str, title: str, post_dir: Path = POST_DIR):
+    """Upload lokalnych obrazów + podmiana src/srcset. Pierwszy wgrany obraz zostaje featured
+    i znika z treści (żeby nie dublowało) — WP sam robi mu rozmiary, więc jego warianty
+    srcset nie są wysyłane; wysyłamy tylko warianty obrazów, które zostają w treści."""
     if not body_html:
         return body_html, None
 
-    images_dir = POST_DIR / "images"
+    images_dir = post_dir / "images"
     if not images_dir.exists():
         return body_html, None
 
-    pattern = r"""src=(["'])(images/[^"']+)\1"""
-    matches = list(re.finditer(pattern, body_html, flags=re.IGNORECASE))
-    if not matches:
+    src_pattern = r"""\bsrc=(["'])(images/[^"']+)\1"""
+    srcset_pattern = r"""\bsrcset=(["'])([^"']*)\1"""
+    tags = [(m, sm.group(2)) for m in re.finditer(r"<img\b[^>]*>\s*", body_html, flags=re.IGNORECASE)
+            if (sm := re.search(src_pattern, m.group(0), flags=re.IGNORECASE))]
+    if not tags:
         return body_html, None
 
-    out = body_html
-    featured_media_id = None
-
-    for m in matches:
-        local_rel = m.group(2)  # images/xxx.png
+    def _upload(local_rel):
         local_name = local_rel.split("/", 1)[1] if "/" in local_rel else local_rel
-        local_path = images_dir / local_name
+        return _upload_media_to_wp(images_dir / local_name, title)
 
-        source_url, media_id = _upload_media_to_wp(local_path, title)
-        if not source_url:
-            continue
-
-        if featured_media_id is None and media_id:
-            featured_media_id = media_id
+    def _upload_all(rels):
+        rels = list(dict.fromkeys(rels))   # bez powtórzeń
+        if not rels:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(WP_UPLOAD_WORKERS, len(rels))) as pool:
+            return dict(zip(rels, pool.map(_upload, rels)))
 
-        out = re.sub(
-            r"""src=(["'])%s\1""" % re.escape(local_rel),
-            f'src="{source_url}"',
-            out,
-            count=1,
-            flags=re.IGNORECASE
-        )
+    # 1) obrazy z src równolegle; kolejność w treści decyduje o featured
+    uploaded = _upload_all(rel for _, rel in tags)
+    featured_media_id = None
+    featured_tag = None
+    for m, rel in tags:
+        if uploaded[rel][1]:
+            featured_media_id, featured_tag = uploaded[rel][1], m
+            break
+
+    # 2) warianty szerokości (image_postprocess) tylko dla <img>, które zostają w treści
+    kept = [(m, rel) for m, rel in tags if m is not featured_tag]
+    uploaded.update(_upload_all(
+        entry.split()[0]
+        for m, _ in kept
+        for sm in re.finditer(srcset_pattern, m.group(0), flags=re.IGNORECASE)
+        for entry in sm.group(2).split(",")
+        if entry.strip().startswith("images/") and entry.split()[0] not in uploaded))
+
+    def _swap_srcset(sm):
+        entries = []
+        for entry in sm.group(2).split(","):
+            parts = entry.split()
+            if parts and (uploaded.get(parts[0]) or (None,))[0]:
+                parts[0] = uploaded[parts[0]][0]
+            entries.append(" ".join(parts))
+        return f'srcset="{", ".join(entries)}"'
 
+    out = body_html
+    for m, rel in reversed(tags):   # od końca — pozycje wcześniejszych tagów się nie przesuwają
+        if m is featured_tag:
+            tag = ""
+        else:
+            tag = m.group(0)
+            source_url = uploaded[rel][0]
+            if source_url:
+                tag = re.sub(src_pattern, f'src="{source_url}"', tag, count=1, flags=re.IGNORECASE)
+            tag = re.sub(srcset_pattern, _swap_srcset, tag, flags=re.IGNORECASE)
+        out = out[:m.start()] + tag + out[m.end():]
     return out, featured_media_id
 
-def _remove_first_img_tag(html: str) -> str:
-    if not html:
-        return html
-    return re.sub(r"<img\b[^>]*>\s*", "", html, count=1, flags=re.IGNORECASE)
-
 # ─────────────────────────────────────────────
 # 🌐 6. Publikacja na WordPress — 415-proof
 # ─────────────────────────────────────────────
-def publish_to_wordpress():
-    if not POST_DIR.exists():
-        print(f"❌ Folder {POST_DIR} nie istnieje.")
-        return
+def publish_to_wordpress(post_dir: Path = POST_DIR, category: str = "Aktualności") -> list[dict]:
+    """Publikuje wszystkie *.txt z post_dir; zwraca raport per plik (status, id, link, błąd).
+    Kilka postów idzie przez /wp-json/batch/v1 (jeśli WP obsługuje), inaczej równolegle pojedynczo."""
+    if not post_dir.exists():
+        print(f"❌ Folder {post_dir} nie istnieje.")
+        return []
 
-    if not (API_ENDPOINT and AUTH and WP_URL):
+    if not wp.configured:
         print("⚠️ Brak konfiguracji WP_URL/WP_USER/WP_APP_PASSWORD – pomijam publikację.")
-        return
-
-    headers_json = {
-        "Accept": "application/json",
-        "Content-Type": "application/json; charset=UTF-8",
-        "Cache-Control": "no-cache",
-        "Pragma": "no-cache",
-        "User-Agent": "GenesManager/1.0 (+requests)"
-    }
-    headers_form = {
-        "Accept": "application/json",
-        "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-        "Cache-Control": "no-cache",
-        "Pragma": "no-cache",
-        "User-Agent": "GenesManager/1.0 (+requests)"
-    }
-
-    def _post_with_fallback(payload):
-        resp = requests.post(API_ENDPOINT, auth=AUTH, headers=headers_json, json=payload, timeout=30)
-        if resp.status_code == 201:
-            return resp
-
-        if resp.status_code in (400, 403, 404, 406, 415, 500):
-            resp2 = requests.post(
-                API_ENDPOINT, auth=AUTH, headers=headers_json,
-                data=json.dumps(payload).encode("utf-8"), timeout=30
-            )
-            if resp2.status_code == 201:
-                return resp2
-
-            resp3 = requests.post(
-                API_ENDPOINT, auth=AUTH, headers=headers_form,
-                data={"title": payload["title"], "content": payload["content"], "status": payload["status"]},
-                timeout=30
-            )
-            return resp3
-        return resp
+        return []
 
-    for file in sorted(POST_DIR.glob("*.txt")):
+    def _prepare(file, cat_id):
         title, body = extract_title_and_body(file)
         if not (title and body):
-            print(f"⚠️ Pominięto pusty lub niepoprawny plik: {file.name}")
-            continue
+            return None, None
 
-        # upload + podmiana src + featured id
-        body2, featured_media_id = _replace_local_images_with_wp_urls(body, title)
-
-        # ✅ jeśli jest featured image, usuń obrazek z treści (żeby nie dublowało)
-        if featured_media_id:
-            body2 = _remove_first_img_tag(body2)
+        # upload + podmiana src + featured id (featured obrazek usunięty z treści, żeby nie dublowało)
+        body2, featured_media_id = _replace_local_images_with_wp_urls(body, title, post_dir)
 
         meta_desc = _extract_meta_desc(body2)
-        cat_id = _get_aktualnosci_category_id()
 
         payload: dict = {
             "title": title,
@@ -493,26 +608,91 @@ def publish_to_wordpress():
             payload["featured_media"] = featured_media_id
         if cat_id:
             payload["categories"] = [cat_id]
-
-        resp = _post_with_fallback(payload)
-        if resp.status_code == 201:
+        return title, payload
+
+    def _prepare_all(files):
+        cat_id = _get_category_id(category)
+        with ThreadPoolExecutor(max_workers=WP_UPLOAD_WORKERS) as pool:
+            return list(pool.map(lambda f: _prepare(f, cat_id), files))
+
+    all_files = sorted(post_dir.glob("*.txt"))
+    files = []
+    skipped = []
+    for file, (title, payload) in zip(all_files, _prepare_all(all_files)):
+        if not payload:
+            print(f"⚠️ Pominięto pusty lub niepoprawny plik: {file.name}")
+            record_publish_failure(file.name)   # inaczej wznawiany w nieskończoność
+            skipped.append({"file": file.name, "title": title, "status": None, "id": None, "link": None,
+                            "error": "pusty lub niepoprawny plik"})
+            continue
+        files.append([file, title, payload])
+    if not files:
+        return skipped
+
+    # 415-proof: JSON → JSON jako bajty → formularz; działająca strategia jest zapamiętywana
+    results = wp.create_posts([payload for _, _, payload in files])
+
+    # ID z cache metadanych już nie istnieje w WP (usunięta kategoria/media) — te pliki raz od nowa
+    stale = [i for i, (status, body) in enumerate(results)
+             if status != 201 and wp.invalidate_for(status, body, files[i][2])]
+    if stale:
+        print(f"♻️ Nieaktualne ID z cache WP — ponawiam {len(stale)} post(y)")
+        for i, (title, payload) in zip(stale, _prepare_all([files[i][0] for i in stale])):
+            files[i][1:] = [title, payload]
+        for i, res in zip(stale, wp.create_posts([files[i][2] for i in stale])):
+            results[i] = res
+
+    report = list(skipped)
+    for (file, title, _), (status, body) in zip(files, results):
+        body = body if isinstance(body, dict) else {}
+        item = {"file": file.name, "title": title, "status": status,
+                "id": body.get("id"), "link": body.get("link"), "error": None}
+        if status == 201:
             print(f"✅ Opublikowano: {title}")
+            clear_for_output(file.name)
         else:
-            preview = (resp.text or "")[:600].replace("\n", " ")
-            print(f"❌ Błąd publikacji {title}: {resp.status_code} – {preview}")
+            item["error"] = body.get("message") or body.get("code") or ""
+            preview = str(item["error"])[:600].replace("\n", " ")
+            print(f"❌ Błąd publikacji {title}: {status} – {preview}")
+            record_publish_failure(file.name)
+        report.append(item)
+
+    ok = sum(1 for r in report if r["status"] == 201)
+    print(f"📊 Publikacja: {ok}/{len(report)} OK")
+    print(f"🔌 WP REST: {wp.stats['żądania']} żądań, {wp.stats['ponowienia']} ponowień, "
+          f"strategia postów: {wp.post_strategy or '—'}")
+    return report
 
 # ─────────────────────────────────────────────
 # 🚀 7. Główna logika
 # ─────────────────────────────────────────────
-def main():
-    print("\n🛠️ 1. Uruchamianie parsera...")
+def _run_parser_subprocess() -> list | None:
     parser_path = Path(__file__).parent / "parser_all_sources_combined_dziala.py"
-    result = subprocess.run(["python", str(parser_path.resolve())])
+    result = subprocess.run([sys.executable, str(parser_path.resolve())])
 
     if result.returncode != 0:
         print("❌ Parser nie został uruchomiony poprawnie (kontynuuję, jeśli JSON istnieje).")
 
-    # Bezpieczne czyszczenie output_posts
+    if not ARTICLES_JSON_PATH.exists():
+        print("❌ Nie znaleziono pliku all_articles_combined.json po parsowaniu.")
+        return None
+
+    with ARTICLES_JSON_PATH.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _run_parser_inprocess() -> list | None:
+    # import dopiero tutaj: selenium/bs4 ładowane tylko gdy parser faktycznie rusza
+    import parser_all_sources_combined_dziala as parser
+    try:
+        return parser.crawl_articles()
+    except Exception as e:
+        print(f"❌ Parser zakończył się błędem: {e}")
+        return None
+
+
+def _clean_post_dir():
+    # Bezpieczne czyszczenie output_posts (checkpointy generacji leżą poza nim — GEN_CHECKPOINT_DIR)
     POST_DIR.mkdir(exist_ok=True)
     for file in POST_DIR.glob("*"):
         try:
@@ -523,30 +703,107 @@ def main():
         except Exception as e:
             print(f"⚠️ Nie udało się usunąć {file}: {e}")
 
-    if not ARTICLES_JSON_PATH.exists():
-        print("❌ Nie znaleziono pliku all_articles_combined.json po parsowaniu.")
-        return
 
-    print("\n📥 2. Wczytywanie artykułów...")
-    with ARTICLES_JSON_PATH.open("r", encoding="utf-8") as f:
-        all_articles = json.load(f)
+def _resumable_articles(n=2) -> list[dict]:
+    """Artykuły z przerwaną generacją (checkpoint), jeszcze nieopublikowane — mają pierwszeństwo."""
+    resumed = [a for a in pending_articles() if not _article_published(a)][:n]
+    for a in resumed:
+        print(f"♻️ Wznawiam generację: {a.get('title', '')[:90]}")
+    return resumed
 
-    print("\n🎯 3. Wybór 2 najważniejszych artykułów (priorytet: kontraktowanie NFZ + dofinansowania)...")
-    selected = pick_most_relevant_articles(all_articles, n=2, retries=2)
 
-    if not selected:
-        print("⚠️ Brak nowych artykułów do przetworzenia.")
-        return
+def _with_resumed(resumed: list[dict], picked: list[dict], n=2) -> list[dict]:
+    keys = {_key_for_article(a) for a in resumed}
+    return (resumed + [a for a in picked if _key_for_article(a) not in keys])[:n]
+
+
+def _stream_select_and_generate(n=2) -> bool:
+    """Parsery oddają partie na bieżąco; gdy jest ≥ n tematów z _prio_score ≥ PRIO_AUTOPICK,
+    generacja rusza w tle, a crawl pozostałych źródeł trwa dalej.
+    Zwraca True, jeśli coś wygenerowano."""
+    import parser_all_sources_combined_dziala as parser
 
-    print("\n✍️ 4. Generowanie postów z AI...")
+    collected: list[dict] = []
+    candidates: list[dict] = []
+    seen_keys: set[str] = set()
+    gen_future = None
+
+    resumed = _resumable_articles(n)
+    if len(resumed) >= n:
+        generate_posts(resumed)
+        return True
+    seen_keys.update(_key_for_article(a) for a in resumed)
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="generate") as gen_pool:
+        for key, batch in parser.iter_articles():
+            collected.extend(batch)
+            if gen_future is not None:
+                continue
+            candidates.extend(_prepare_candidates(batch, seen_keys))
+            prio = sorted((a for a in candidates if _prio_score(a) >= PRIO_AUTOPICK),
+                          key=_prio_score, reverse=True)
+            if len(prio) >= n - len(resumed):
+                print(f"⭐ Priorytet po źródle '{key}': start generacji, crawl trwa dalej.")
+                gen_future = gen_pool.submit(generate_posts, _with_resumed(resumed, prio, n))
+
+        if gen_future is not None:
+            gen_future.result()
+            return True
+
+    print(f"\n🎯 Brak autowyboru w trakcie crawla — wybór z {len(collected)} artykułów...")
+    selected = _with_resumed(resumed, pick_most_relevant_articles(collected, n=n, retries=2), n)
+    if not selected:
+        return False
+    print("\n✍️ Generowanie postów z AI...")
     generate_posts(selected)
+    return True
+
+
+def main():
+    if PIPELINE_STREAMING:
+        _clean_post_dir()
+        print("\n🛠️ 1–4. Parser + wybór + generacja (streaming)...")
+        if not _stream_select_and_generate(n=2):
+            print("⚠️ Brak nowych artykułów do przetworzenia.")
+            return
+    else:
+        print("\n🛠️ 1. Uruchamianie parsera...")
+        all_articles = _run_parser_subprocess() if PARSER_SUBPROCESS else _run_parser_inprocess()
+
+        _clean_post_dir()
+
+        if all_articles is None:
+            return
+
+        print(f"\n📥 2. Zebrano {len(all_articles)} artykułów.")
+
+        print("\n🎯 3. Wybór 2 najważniejszych artykułów (priorytet: kontraktowanie NFZ + dofinansowania)...")
+        resumed = _resumable_articles(n=2)
+        picked = pick_most_relevant_articles(all_articles, n=2, retries=2) if len(resumed) < 2 else []
+        selected = _with_resumed(resumed, picked, n=2)
+
+        if not selected:
+            print("⚠️ Brak nowych artykułów do przetworzenia.")
+            return
+
+        print("\n✍️ 4. Generowanie postów z AI...")
+        generate_posts(selected)
 
     print("\n🌐 5. Publikacja na WordPress...")
     publish_to_wordpress()
 
-    print("\n💾 6. Deduplikacja: source URL zapisany w treści postów WP — brak pliku lokalnego.")
+    print("\n💾 6. Deduplikacja: source URL zapisany w treści postów WP (indeks odświeżany z WP).")
 
     print("\n✅ Zakończono cały pipeline.")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--publish", metavar="DIR",
+                    help="tylko publikacja gotowych plików z DIR (np. output_blog), bez parsera i generacji")
+    ap.add_argument("--category", default="Aktualności", help="kategoria WP dla --publish ('' = bez kategorii)")
+    args = ap.parse_args()
+    if args.publish:
+        publish_to_wordpress(Path(args.publish), category=args.category)
+    else:
+        main()
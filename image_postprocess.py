@@ -0,0 +1,92 @@
+"""
+Obróbka wygenerowanych obrazów przed uploadem do WP: PNG 1024×1024 z gpt-image-1 →
+WebP (lub AVIF) z zadaną jakością, mniejsze warianty do srcset, bez metadanych.
+
+Pillow jest opcjonalny — bez niego (albo IMAGE_FORMAT=png) zostaje oryginalny PNG.
+AVIF wymaga Pillow z libavif (≥ 11.2) lub wtyczki pillow-avif-plugin; inaczej WebP.
+"""
+
+import os
+from pathlib import Path
+
+try:
+    from PIL import Image, features
+except Exception:
+    Image = None
+    features = None
+
+try:
+    import pillow_avif  # noqa: F401  (rejestruje format AVIF w Pillow)
+except Exception:
+    pass
+
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "webp").strip().lower()        # webp | avif | png
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_WIDTHS = sorted({int(w) for w in os.getenv("IMAGE_WIDTHS", "480,768").split(",") if w.strip()})
+
+_SUFFIX = {"webp": ".webp", "avif": ".avif"}
+
+
+def _target_format() -> str | None:
+    if Image is None or IMAGE_FORMAT not in _SUFFIX:
+        return None
+    if IMAGE_FORMAT == "avif" and "AVIF" not in Image.registered_extensions().values():
+        print("⚠️ Pillow bez obsługi AVIF — zapisuję WebP", flush=True)
+        return "webp" if features.check("webp") else None
+    if IMAGE_FORMAT == "webp" and not features.check("webp"):
+        return None
+    return IMAGE_FORMAT
+
+
+def _save(im, out_path: Path, fmt: str):
+    if fmt == "webp":
+        im.save(out_path, "WEBP", quality=IMAGE_QUALITY, method=6)
+    else:
+        im.save(out_path, "AVIF", quality=IMAGE_QUALITY)
+
+
+def transcode(png_path: Path) -> tuple[Path, list[tuple[Path, int]]]:
+    """Zwraca (plik główny, warianty [(plik, szerokość)] rosnąco z głównym na końcu).
+    Bez konwersji: (png_path, []). Oryginalny PNG jest usuwany po udanej konwersji."""
+    fmt = _target_format()
+    if fmt is None or not png_path.is_file():
+        return png_path, []
+
+    try:
+        with Image.open(png_path) as src:
+            src.load()
+            # nowy obraz z samych pikseli = bez EXIF/XMP/chunków tekstowych PNG
+            has_alpha = src.mode in ("RGBA", "LA") or (src.mode == "P" and "transparency" in src.info)
+            mode = "RGBA" if has_alpha else "RGB"
+            im = Image.new(mode, src.size)
+            im.paste(src.convert(mode))
+
+        main_path = png_path.with_suffix(_SUFFIX[fmt])
+        _save(im, main_path, fmt)
+        variants = []
+        for width in IMAGE_WIDTHS:
+            if width >= im.width:
+                continue
+            height = round(im.height * width / im.width)
+            variant_path = png_path.with_name(f"{png_path.stem}-{width}w{_SUFFIX[fmt]}")
+            _save(im.resize((width, height), Image.LANCZOS), variant_path, fmt)
+            variants.append((variant_path, width))
+        variants.append((main_path, im.width))
+    except Exception as e:
+        print(f"⚠️ Konwersja obrazu {png_path.name} nie powiodła się ({e}) — zostaje PNG", flush=True)
+        return png_path, []
+
+    before = png_path.stat().st_size
+    png_path.unlink(missing_ok=True)
+    print(f"🗜️ {png_path.name} → {main_path.name}: {before // 1024} KB → "
+          f"{main_path.stat().st_size // 1024} KB (+{len(variants) - 1} wariantów)", flush=True)
+    return main_path, variants
+
+
+def responsive_attrs(variants: list[tuple[Path, int]], prefix: str = "images/") -> str:
+    """Atrybuty srcset/sizes do <img> (pusty napis, gdy nie ma wariantów)."""
+    if len(variants) < 2:
+        return ""
+    srcset = ", ".join(f"{prefix}{p.name} {w}w" for p, w in variants)
+    full = variants[-1][1]
+    return f' srcset="{srcset}" sizes="(max-width: {full}px) 100vw, {full}px"'
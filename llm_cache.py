@@ -0,0 +1,79 @@
+"""
+Trwały cache odpowiedzi LLM adresowany treścią: klucz = sha256(łańcuch modeli, messages, parametry).
+Wspólny dla generatora aktualności i blog_generator — ponowny run po nieudanej publikacji
+w WP nie płaci drugi raz za research i artykuły.
+
+TTL per etap (godziny) z env `LLM_CACHE_TTL_<ETAP>`: `0` = nie cache'uj, `inf` = bez wygasania.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from diskstore import JsonDirCache
+
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".llm_cache").strip()   # pusty = cache wyłączony
+LLM_CACHE_MB = float(os.getenv("LLM_CACHE_MB", "100"))
+
+# domyślne TTL w godzinach (None = bez wygasania)
+DEFAULT_TTL_HOURS = {
+    "h1": 24 * 7,
+    "image_meta": None,
+    "research": 24,
+    "article": 24,
+}
+_FALLBACK_TTL_HOURS = 24
+
+
+def _ttl_seconds(stage: str) -> float | None:
+    """Sekundy ważności; 0 = etap nie jest cache'owany, None = bez wygasania."""
+    raw = os.getenv(f"LLM_CACHE_TTL_{stage.upper()}", "").strip().lower()
+    if raw:
+        if raw in ("inf", "none", "-1"):
+            return None
+        try:
+            return max(0.0, float(raw)) * 3600
+        except ValueError:
+            print(f"⚠️ LLM_CACHE_TTL_{stage.upper()}={raw!r} — niepoprawna wartość, używam domyślnej")
+    hours = DEFAULT_TTL_HOURS.get(stage, _FALLBACK_TTL_HOURS)
+    return None if hours is None else hours * 3600
+
+
+def cache_key(models: list[str], messages: list[dict], params: dict | None = None) -> str:
+    payload = json.dumps({"models": models, "messages": messages, "params": params or {}},
+                         ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _LlmCache(JsonDirCache):
+    """Jeden plik JSON na klucz; LRU po mtime (trafienie odświeża mtime), limit w bajtach."""
+
+    def __init__(self, root: Path, max_bytes: int):
+        super().__init__(root, max_bytes)
+        self.stats = {"trafienia": 0, "chybienia": 0}
+
+    def get(self, stage: str, key: str) -> str | None:
+        ttl = _ttl_seconds(stage)
+        if ttl == 0:
+            return None
+        entry = self._read(key)
+        if entry is None or (ttl is not None and time.time() - entry.get("created", 0) > ttl):
+            self.stats["chybienia"] += 1
+            return None
+        self._touch(key)
+        self.stats["trafienia"] += 1
+        return entry.get("value")
+
+    def put(self, stage: str, key: str, value: str, model: str = ""):
+        if _ttl_seconds(stage) == 0 or not value:
+            return
+        entry = {"stage": stage, "model": model, "created": time.time(), "value": value}
+        try:
+            self._write(key, entry)
+        except OSError as e:
+            print(f"⚠️ cache LLM zapis: {e}")
+
+
+llm_cache = _LlmCache(Path(LLM_CACHE_DIR), int(LLM_CACHE_MB * 1024 * 1024)) if LLM_CACHE_DIR else None
@@ -1,19 +1,30 @@
 """
 Parser aktualności medycznych — GenesManager.
-Strategia: requests/BS4 jako primary, jeden wspólny Selenium driver (lazy) jako fallback.
-Jeden Chrome na całe uruchomienie — uruchamiany tylko gdy BS4 zawiedzie.
+Strategia: requests/BS4 jako primary, pula Selenium (lazy, domyślnie jeden Chrome) jako fallback.
+Chrome uruchamiany tylko gdy BS4 zawiedzie (albo podpinany do długo żyjącego: --serve-browser).
 """
 
+import calendar
+import hashlib
 import json
 import re
+import subprocess
+import sys
+import threading
 import time
 import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
+from urllib.parse import urljoin, urlsplit
 import os
 
 import requests
-from bs4 import BeautifulSoup
+import soupsieve as sv
+from bs4 import BeautifulSoup, SoupStrainer
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
@@ -23,53 +34,225 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from diskstore import JsonDirCache, write_json_atomic
+from urlnorm import normalize_url
+
 DAYS_BACK = 9
 CUTOFF = datetime.today() - timedelta(days=DAYS_BACK)
 
+# Równoległy crawl: ile źródeł naraz i ile jednoczesnych żądań do jednego hosta
+PARSER_CONCURRENT = os.getenv("PARSER_CONCURRENT", "1").strip() != "0"
+PARSER_WORKERS = max(1, int(os.getenv("PARSER_WORKERS", "5")))
+PARSER_PER_HOST = max(1, int(os.getenv("PARSER_PER_HOST", "2")))
+
 
 # ──────────────────────────────────────────────────────────
-# HTTP session z retry
+# HTTP session z retry — jedna na proces, pula keep-alive per host
 # ──────────────────────────────────────────────────────────
+PARSER_POOL_SIZE = max(1, int(os.getenv("PARSER_POOL_SIZE", "10")))
+
+_shared_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
 def _session() -> requests.Session:
-    s = requests.Session()
-    retry = Retry(
-        total=3, backoff_factor=0.8,
-        status_forcelist=(429, 500, 502, 503, 504),
-        allowed_methods=frozenset(["GET", "HEAD"]),
-        raise_on_status=False,
-    )
-    s.mount("https://", HTTPAdapter(max_retries=retry))
-    s.mount("http://",  HTTPAdapter(max_retries=retry))
-    s.headers.update({
-        "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                       "AppleWebKit/537.36 (KHTML, like Gecko) "
-                       "Chrome/124.0.0.0 Safari/537.36"),
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "pl-PL,pl;q=0.9,en-US;q=0.8",
-        "Accept-Encoding": "gzip, deflate, br",
-        "Cache-Control": "no-cache",
-        "DNT": "1",
-        "Connection": "keep-alive",
-    })
-    return s
+    global _shared_session
+    if _shared_session is not None:
+        return _shared_session
+    with _session_lock:
+        if _shared_session is not None:
+            return _shared_session
+        s = requests.Session()
+        retry = Retry(
+            total=3, backoff_factor=0.8,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            raise_on_status=False,
+        )
+        # pool_connections = ile hostów trzymamy w puli, pool_maxsize = połączeń na host
+        adapter = HTTPAdapter(max_retries=retry,
+                              pool_connections=PARSER_POOL_SIZE,
+                              pool_maxsize=PARSER_POOL_SIZE)
+        s.mount("https://", adapter)
+        s.mount("http://",  adapter)
+        s.headers.update({
+            "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                           "AppleWebKit/537.36 (KHTML, like Gecko) "
+                           "Chrome/124.0.0.0 Safari/537.36"),
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "pl-PL,pl;q=0.9,en-US;q=0.8",
+            "Accept-Encoding": "gzip, deflate, br",
+            "Cache-Control": "no-cache",
+            "DNT": "1",
+            "Connection": "keep-alive",
+        })
+        _shared_session = s
+        return s
+
+
+def _http_pool_stats() -> dict[str, tuple[int, int]]:
+    """host → (żądania, nowe połączenia) z puli urllib3 wspólnej sesji."""
+    if _shared_session is None:
+        return {}
+    stats: dict[str, tuple[int, int]] = {}
+    adapter = _shared_session.get_adapter("https://")
+    pools = adapter.poolmanager.pools
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        req, conn = stats.get(pool.host, (0, 0))
+        stats[pool.host] = (req + pool.num_requests, conn + pool.num_connections)
+    return stats
+
+
+def _print_http_stats():
+    for host, (req, conn) in sorted(_http_pool_stats().items()):
+        print(f"🔌 {host}: {req} żądań, {conn} połączeń (reuse {max(0, req - conn)})")
+    if _http_cache is not None:
+        st = _http_cache.stats
+        print(f"🗄️ Cache HTTP: {st['304']}× 304, {st['200']}× 200, zapisane {st['zapisane']}")
+
+
+# ──────────────────────────────────────────────────────────
+# Cache HTTP na dysku — conditional GET (ETag / Last-Modified)
+# PARSER_HTTP_CACHE_DIR="" wyłącza cache; na Render wskaż persistent disk.
+# ──────────────────────────────────────────────────────────
+PARSER_HTTP_CACHE_DIR = os.getenv("PARSER_HTTP_CACHE_DIR", ".http_cache").strip()
+PARSER_HTTP_CACHE_MB = float(os.getenv("PARSER_HTTP_CACHE_MB", "50"))
+
+
+class _HttpCache(JsonDirCache):
+    """Jeden plik JSON na URL (body + walidatory); LRU po mtime, limit w bajtach."""
+
+    def __init__(self, root: Path, max_bytes: int):
+        super().__init__(root, max_bytes)
+        self.stats = {"304": 0, "200": 0, "zapisane": 0}
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def load(self, url: str) -> dict | None:
+        entry = self._read(self._key(url))
+        return entry if entry and entry.get("url") == url else None
+
+    def touch(self, url: str):
+        self._touch(self._key(url))
+
+    def store(self, url: str, resp: requests.Response):
+        etag = resp.headers.get("ETag")
+        last_mod = resp.headers.get("Last-Modified")
+        if not (etag or last_mod):
+            return   # bez walidatorów nie ma czego odświeżać warunkowo
+        entry = {"url": url, "etag": etag, "last_modified": last_mod, "body": resp.text}
+        try:
+            self._write(self._key(url), entry)
+            self.stats["zapisane"] += 1
+        except OSError as e:
+            print(f"  ⚠️ cache HTTP zapis: {e}")
+
+
+_http_cache = (_HttpCache(Path(PARSER_HTTP_CACHE_DIR), int(PARSER_HTTP_CACHE_MB * 1024 * 1024))
+               if PARSER_HTTP_CACHE_DIR else None)
+
+
+# ──────────────────────────────────────────────────────────
+# Stan crawla (inkrementalnie) — per źródło: najnowszy URL/data + wpisy z okna CUTOFF.
+# Paginacja kończy się na pierwszej stronie ze znanym wpisem, a znane wpisy
+# (wciąż aktualne) są dołączane z pliku, więc wynik jest taki jak przy pełnym crawlu.
+# ──────────────────────────────────────────────────────────
+PARSER_INCREMENTAL = os.getenv("PARSER_INCREMENTAL", "1").strip() != "0"
+PARSER_STATE_PATH = Path(os.getenv("PARSER_STATE_PATH", "crawl_state.json"))
+_STATE_MAX_ITEMS = 300
+_STATE_FIELDS = ("title", "url", "date", "lead", "source")
+
+_crawl_state: dict | None = None
+_crawl_state_lock = threading.Lock()
+
+
+def _load_crawl_state() -> dict:
+    global _crawl_state
+    with _crawl_state_lock:
+        if _crawl_state is None:
+            try:
+                _crawl_state = json.loads(PARSER_STATE_PATH.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                _crawl_state = {}
+        return _crawl_state
+
+
+def _crawl_fields(a: dict) -> dict:
+    """Kopia samych pól crawla — konsument dopisuje do rekordów _prio, duplicates itd."""
+    return {k: a[k] for k in _STATE_FIELDS if k in a}
+
+
+def _known_items(key: str) -> list[dict]:
+    if not PARSER_INCREMENTAL:
+        return []
+    entry = _load_crawl_state().get(key) or {}
+    return [_crawl_fields(a) for a in entry.get("items", []) if _is_recent(a.get("date"))]
+
+
+def _update_crawl_state(key: str, items: list[dict]):
+    if not (PARSER_INCREMENTAL and items):
+        return
+    state = _load_crawl_state()
+    recent = [_crawl_fields(a) for a in items if _is_recent(a.get("date"))][:_STATE_MAX_ITEMS]
+    with _crawl_state_lock:
+        state[key] = {
+            "newest_url": items[0].get("url", ""),
+            "high_water": max((a.get("date") or "" for a in items), default=""),
+            "updated": datetime.now().isoformat(timespec="seconds"),
+            "items": recent,
+        }
+
+
+def _save_crawl_state():
+    if not PARSER_INCREMENTAL or _crawl_state is None:
+        return
+    with _crawl_state_lock:
+        try:
+            write_json_atomic(PARSER_STATE_PATH, _crawl_state, indent=2)
+        except OSError as e:
+            print(f"⚠️ Nie udało się zapisać stanu crawla: {e}")
 
 
 # ──────────────────────────────────────────────────────────
-# Shared lazy Selenium — jeden Chrome na całe uruchomienie
+# Limit współbieżności per host (nfz.gov.pl obsługuje dwa źródła)
 # ──────────────────────────────────────────────────────────
-_shared_driver = None
+_host_slots: dict[str, threading.BoundedSemaphore] = {}
+_host_slots_lock = threading.Lock()
+
 
+def _host_slot(url: str) -> threading.BoundedSemaphore:
+    host = urlsplit(url).netloc.lower()
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = _host_slots[host] = threading.BoundedSemaphore(PARSER_PER_HOST)
+        return slot
 
-def _get_driver():
-    global _shared_driver
-    if _shared_driver is not None:
-        return _shared_driver
 
-    cache = Path.home() / ".cache" / "selenium"
-    cache.mkdir(parents=True, exist_ok=True)
-    os.environ.setdefault("SE_DOWNLOAD_DIR", str(cache))
+# ──────────────────────────────────────────────────────────
+# Pula przeglądarek Selenium (lazy) — Chrome startuje dopiero, gdy BS4 zawiedzie.
+#   PARSER_BROWSERS         : ile driverów naraz (1 = jak dawniej, jeden wspólny Chrome)
+#   PARSER_BLOCK_RESOURCES  : blokada obrazków/fontów/CSS przez CDP (domyślnie włączona)
+#   PARSER_CHROME_DEBUGGER  : host:port działającego Chrome (--serve-browser);
+#                             zamiast zimnego startu podpinamy się i otwieramy własną kartę
+# ──────────────────────────────────────────────────────────
+PARSER_BROWSERS = max(1, int(os.getenv("PARSER_BROWSERS", "1")))
+PARSER_BLOCK_RESOURCES = os.getenv("PARSER_BLOCK_RESOURCES", "1").strip() != "0"
+PARSER_CHROME_DEBUGGER = os.getenv("PARSER_CHROME_DEBUGGER", "").strip()
 
+_BLOCKED_URLS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+                 "*.woff", "*.woff2", "*.ttf", "*.otf", "*.css", "*.mp4", "*.webm"]
+
+
+def _chrome_options() -> Options:
     opts = Options()
+    if PARSER_CHROME_DEBUGGER:
+        opts.add_experimental_option("debuggerAddress", PARSER_CHROME_DEBUGGER)
+        return opts
     opts.add_argument("--headless=new")
     opts.add_argument("--no-sandbox")
     opts.add_argument("--disable-dev-shm-usage")
@@ -78,53 +261,186 @@ def _get_driver():
     opts.add_argument("--disable-blink-features=AutomationControlled")
     opts.add_argument("--window-size=1920,1080")
     opts.page_load_strategy = "eager"
-
-    for attempt in range(1, 3):
-        try:
-            _shared_driver = webdriver.Chrome(options=opts)
-            print("🟢 Chrome uruchomiony (shared driver)")
-            return _shared_driver
-        except Exception as e:
-            print(f"⚠️ Chrome attempt {attempt}: {e}")
-            time.sleep(3)
-    raise RuntimeError("Nie udało się uruchomić Chrome")
+    return opts
 
 
-def _quit_driver():
-    global _shared_driver
-    if _shared_driver is not None:
+def _driver_alive(driver) -> bool:
+    try:
+        return driver.execute_script("return 1") == 1
+    except Exception:
+        return False
+
+
+class _BrowserPool:
+    """N driverów; driver() wypożycza zdrowy egzemplarz albo uruchamia nowy."""
+
+    def __init__(self, size: int):
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle: list = []
+        self._all: list = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def driver(self):
+        with self._slots:
+            drv = self._take()
+            try:
+                yield drv
+            finally:
+                with self._lock:
+                    self._idle.append(drv)
+
+    def _take(self):
+        while True:
+            with self._lock:
+                drv = self._idle.pop() if self._idle else None
+            if drv is None:
+                return self._start()
+            if _driver_alive(drv):
+                return drv
+            print("⚠️ Chrome nie odpowiada — wymieniam driver")
+            self._discard(drv)
+
+    def _start(self):
+        cache = Path.home() / ".cache" / "selenium"
+        cache.mkdir(parents=True, exist_ok=True)
+        os.environ.setdefault("SE_DOWNLOAD_DIR", str(cache))
+
+        for attempt in range(1, 3):
+            try:
+                drv = webdriver.Chrome(options=_chrome_options())
+                break
+            except Exception as e:
+                print(f"⚠️ Chrome attempt {attempt}: {e}")
+                time.sleep(3)
+        else:
+            raise RuntimeError("Nie udało się uruchomić Chrome")
+
+        if PARSER_CHROME_DEBUGGER:
+            drv.switch_to.new_window("tab")   # własna karta w długo żyjącym Chrome
+            print(f"🟢 Chrome podpięty ({PARSER_CHROME_DEBUGGER}), nowa karta")
+        else:
+            print("🟢 Chrome uruchomiony (pula)")
+        if PARSER_BLOCK_RESOURCES:
+            try:
+                drv.execute_cdp_cmd("Network.enable", {})
+                drv.execute_cdp_cmd("Network.setBlockedURLs", {"urls": _BLOCKED_URLS})
+            except Exception as e:
+                print(f"⚠️ CDP: blokada zasobów niedostępna: {e}")
+        with self._lock:
+            self._all.append(drv)
+        return drv
+
+    def _discard(self, drv):
+        with self._lock:
+            if drv in self._all:
+                self._all.remove(drv)
+        self._close_one(drv)
+
+    @staticmethod
+    def _close_one(drv):
         try:
-            _shared_driver.quit()
+            if PARSER_CHROME_DEBUGGER:
+                drv.close()   # zamknij tylko naszą kartę, przeglądarka żyje dalej
+            else:
+                drv.quit()
         except Exception:
             pass
-        _shared_driver = None
-        print("🔴 Chrome zakończony")
+
+    def close(self):
+        with self._lock:
+            drivers, self._all, self._idle = self._all, [], []
+        for drv in drivers:
+            self._close_one(drv)
+        if drivers:
+            print(f"🔴 Chrome zakończony ({len(drivers)})")
+
+
+_browser_pool = _BrowserPool(PARSER_BROWSERS)
+
+
+def _serve_browser(port: int = 9222):
+    """Długo żyjący headless Chrome, do którego podpinają się kolejne runy crona."""
+    chrome = os.getenv("CHROME_BIN", "google-chrome-stable")
+    cmd = [chrome, "--headless=new", "--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu",
+           f"--remote-debugging-port={port}", "--user-data-dir=/tmp/genesmanager-chrome",
+           "--window-size=1920,1080"]
+    print(f"🟢 Chrome na porcie {port} — ustaw PARSER_CHROME_DEBUGGER=127.0.0.1:{port}")
+    subprocess.run(cmd)
 
 
 # ──────────────────────────────────────────────────────────
 # Parsowanie dat
 # ──────────────────────────────────────────────────────────
-_DATE_FMTS = ["%d.%m.%Y", "%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y"]
+# Jeden skompilowany regex zamiast kolejnych strptime w try/except.
+# Obsługuje: d.m.Y / d-m-Y / d/m/Y, Y-m-d, „12 marca 2026”, „wczoraj”, „2 godz. temu”.
+_PL_MONTHS = {
+    "stycznia": 1, "styczeń": 1, "styczen": 1, "sty": 1,
+    "lutego": 2, "luty": 2, "lut": 2,
+    "marca": 3, "marzec": 3, "mar": 3,
+    "kwietnia": 4, "kwiecień": 4, "kwiecien": 4, "kwi": 4,
+    "maja": 5, "maj": 5,
+    "czerwca": 6, "czerwiec": 6, "cze": 6,
+    "lipca": 7, "lipiec": 7, "lip": 7,
+    "sierpnia": 8, "sierpień": 8, "sierpien": 8, "sie": 8,
+    "września": 9, "wrzesnia": 9, "wrzesień": 9, "wrzesien": 9, "wrz": 9,
+    "października": 10, "pazdziernika": 10, "październik": 10, "pazdziernik": 10,
+    "paź": 10, "paz": 10,
+    "listopada": 11, "listopad": 11, "lis": 11,
+    "grudnia": 12, "grudzień": 12, "grudzien": 12, "gru": 12,
+}
+_RELATIVE_DAYS = {"dzisiaj": 0, "dziś": 0, "dzis": 0, "wczoraj": 1, "przedwczoraj": 2}
+
+_DATE_RE = re.compile(
+    r"(?P<d>\d{1,2})[.\-/](?P<m>\d{1,2})[.\-/](?P<y>\d{4})"
+    r"|(?P<iy>\d{4})-(?P<im>\d{1,2})-(?P<id>\d{1,2})"
+    r"|(?P<pd>\d{1,2})\.?\s+(?P<pm>"
+    + "|".join(sorted(_PL_MONTHS, key=len, reverse=True))
+    + r")\.?,?\s+(?P<py>\d{4})"
+    r"|\b(?P<rel>przedwczoraj|wczoraj|dzisiaj|dziś|dzis)\b"
+    r"|(?:(?P<n>\d{1,3})\s*|\b)(?P<unit>min|godz|h\b|dni|dzie|tydz|tyg)\w*\.?\s+temu\b",
+    re.IGNORECASE,
+)
+_UNIT_DELTA = {
+    "min": timedelta(minutes=1), "godz": timedelta(hours=1), "h": timedelta(hours=1),
+    "dni": timedelta(days=1), "dzie": timedelta(days=1),
+    "tydz": timedelta(weeks=1), "tyg": timedelta(weeks=1),
+}
+
+
+def _ymd(y: int, m: int, d: int) -> str | None:
+    if 1900 <= y <= 2100 and 1 <= m <= 12 and 1 <= d <= calendar.monthrange(y, m)[1]:
+        return f"{y:04d}-{m:02d}-{d:02d}"
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_cached(text: str, now_hour: str) -> str | None:
+    """now_hour (YYYYmmddHH) jest częścią klucza cache — daty względne się starzeją."""
+    now = datetime.strptime(now_hour, "%Y%m%d%H")
+    for m in _DATE_RE.finditer(text):
+        g = m.groupdict()
+        if g["d"]:
+            out = _ymd(int(g["y"]), int(g["m"]), int(g["d"]))
+        elif g["iy"]:
+            out = _ymd(int(g["iy"]), int(g["im"]), int(g["id"]))
+        elif g["pm"]:
+            out = _ymd(int(g["py"]), _PL_MONTHS[g["pm"].lower()], int(g["pd"]))
+        elif g["rel"]:
+            out = (now - timedelta(days=_RELATIVE_DAYS[g["rel"].lower()])).strftime("%Y-%m-%d")
+        else:
+            unit = g["unit"].lower()
+            out = (now - int(g["n"] or 1) * _UNIT_DELTA[unit]).strftime("%Y-%m-%d")
+        if out:
+            return out
+    return None
 
 
 def _parse_date_str(text: str) -> str | None:
     t = (text or "").strip()
-    for fmt in _DATE_FMTS:
-        try:
-            return datetime.strptime(t, fmt).strftime("%Y-%m-%d")
-        except ValueError:
-            pass
-    # d.m.Y lub Y-m-d w środku tekstu
-    m = re.search(r"(\d{1,2})[.\-/](\d{1,2})[.\-/](\d{4})", t)
-    if m:
-        try:
-            return datetime.strptime(f"{m.group(1)}.{m.group(2)}.{m.group(3)}", "%d.%m.%Y").strftime("%Y-%m-%d")
-        except ValueError:
-            pass
-    m2 = re.search(r"(\d{4})-(\d{2})-(\d{2})", t)
-    if m2:
-        return f"{m2.group(1)}-{m2.group(2)}-{m2.group(3)}"
-    return None
+    if not t:
+        return None
+    return _parse_date_cached(t, datetime.now().strftime("%Y%m%d%H"))
 
 
 def _date_from_el(el) -> str | None:
@@ -148,420 +464,638 @@ def _is_recent(date_str: str | None) -> bool:
         return True
 
 
+# ──────────────────────────────────────────────────────────
+# Backend parsowania HTML
+# PARSER_HTML_BACKEND: auto | lxml | html5-parser | html.parser
+# ──────────────────────────────────────────────────────────
+def _available_backends() -> list[str]:
+    out = []
+    try:
+        import lxml  # noqa: F401
+        out.append("lxml")
+    except ImportError:
+        pass
+    try:
+        import html5_parser  # noqa: F401
+        out.append("html5-parser")
+    except ImportError:
+        pass
+    out.append("html.parser")
+    return out
+
+
+def _pick_backend(choice: str) -> str:
+    available = _available_backends()
+    choice = (choice or "auto").strip().lower()
+    if choice in available:
+        return choice
+    if choice != "auto":
+        print(f"⚠️ Backend HTML '{choice}' niedostępny → {available[0]}")
+    return available[0]
+
+
+HTML_BACKEND = _pick_backend(os.getenv("PARSER_HTML_BACKEND", "auto"))
+
+
+def _make_soup(html: str, parse_only: SoupStrainer | None = None,
+               backend: str | None = None) -> BeautifulSoup:
+    backend = backend or HTML_BACKEND
+    if backend == "html5-parser":
+        # html5-parser buduje drzewo w C, ale nie obsługuje parse_only
+        from html5_parser import parse as html5_parse
+        return html5_parse(html, treebuilder="soup")
+    return BeautifulSoup(html, backend, parse_only=parse_only)
+
+
 # ──────────────────────────────────────────────────────────
 # Szybki fetch przez requests
 # ──────────────────────────────────────────────────────────
-def _fetch(url: str, timeout: int = 20) -> BeautifulSoup | None:
+def _fetch_html(url: str, timeout: int = 20) -> str | None:
+    cached = _http_cache.load(url) if _http_cache is not None else None
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
     try:
-        r = _session().get(url, timeout=timeout, allow_redirects=True)
+        with _host_slot(url):
+            r = _session().get(url, headers=headers, timeout=timeout, allow_redirects=True)
+        if r.status_code == 304 and cached:
+            _http_cache.stats["304"] += 1
+            _http_cache.touch(url)
+            return cached["body"]
         if r.status_code == 200 and len(r.text) > 3000:
-            return BeautifulSoup(r.text, "html.parser")
+            if _http_cache is not None:
+                _http_cache.stats["200"] += 1
+                _http_cache.store(url, r)
+            return r.text
         print(f"  requests: status {r.status_code} lub pusty")
     except Exception as e:
         print(f"  requests błąd: {e}")
     return None
 
 
-def _soup_from_selenium(url: str, wait_css: str, wait_sec: int = 20) -> BeautifulSoup | None:
-    driver = _get_driver()
-    try:
-        driver.get(url)
-        WebDriverWait(driver, wait_sec).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, wait_css))
-        )
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight/4);")
-        time.sleep(0.8)
-        return BeautifulSoup(driver.page_source, "html.parser")
-    except Exception as e:
-        print(f"  Selenium błąd ({url}): {e}")
-        return None
-
-
 # ──────────────────────────────────────────────────────────
-# NFZ Centrala
+# Gotowość strony w Selenium — czekamy na konkretne warunki DOM zamiast stałych sleepów
 # ──────────────────────────────────────────────────────────
-def _extract_nfz_centrala(soup: BeautifulSoup) -> list[dict]:
-    items = soup.select("div.news, li.news, article.news")
-    out = []
-    for art in items:
-        try:
-            date_el = art.select_one(".date, span.date, time")
-            date_str = _date_from_el(date_el)
-            if not _is_recent(date_str):
-                continue
-            a = art.select_one(".title a, h3 a, h2 a, a")
-            if not a:
-                continue
-            title = a.get_text(strip=True) or "Aktualizacja NFZ Centrala"
-            href = (a.get("href") or "").strip()
-            if href and not href.startswith("http"):
-                href = "https://www.nfz.gov.pl" + href
-            out.append({"date": date_str or datetime.today().strftime("%Y-%m-%d"),
-                        "title": title, "url": href, "source": "NFZ Centrala"})
-        except Exception:
-            continue
-    return out
+_wait_stats: dict[str, list[float]] = {}
+_wait_stats_lock = threading.Lock()
+
+_COOKIE_XPATHS = [
+    "//button[contains(., 'Akceptuj wszystkie')]",
+    "//button[@id='cookiescript_accept']",
+    "//button[contains(., 'akceptuj')]",
+    "//button[@id='onetrust-accept-btn-handler']",
+]
+
+# liczba elementów listy, liczba pobranych zasobów (Resource Timing), readyState
+_JS_READY_PROBE = """
+return [document.querySelectorAll(arguments[0]).length,
+        performance.getEntriesByType('resource').length,
+        document.readyState];
+"""
 
 
-def parse_nfz_centrala_articles() -> list[dict]:
-    print("▶ NFZ Centrala")
-    base = "https://www.nfz.gov.pl/aktualnosci/aktualnosci-centrali/"
-    all_art: list[dict] = []
+@contextmanager
+def _timed_wait(name: str):
+    t0 = time.monotonic()
+    try:
+        yield
+    finally:
+        with _wait_stats_lock:
+            _wait_stats.setdefault(name, []).append(time.monotonic() - t0)
 
-    # BS4 primary
-    for page in range(1, 4):
-        url = base if page == 1 else f"{base}?page={page}"
-        soup = _fetch(url)
-        if not soup:
-            break
-        found = _extract_nfz_centrala(soup)
-        all_art.extend(found)
-        if found and not _is_recent(found[-1].get("date")):
-            break
 
-    if all_art:
-        print(f"✅ NFZ Centrala (BS4): {len(all_art)}")
-        return all_art
+class _ProbeStable:
+    """Warunek WebDriverWait: ten sam odczyt dwa razy z rzędu (lista przestała rosnąć,
+    brak nowych żądań sieciowych) i dokument już nie w stanie 'loading'."""
 
-    # Selenium fallback
-    print("  → Selenium fallback")
-    for page in range(1, 4):
-        url = base if page == 1 else f"{base}?page={page}"
-        soup = _soup_from_selenium(url, "div.news, li.news")
-        if not soup:
-            break
-        found = _extract_nfz_centrala(soup)
-        all_art.extend(found)
-        if found and not _is_recent(found[-1].get("date")):
-            break
+    def __init__(self, css: str):
+        self.css = css
+        self.last = None
 
-    print(f"✅ NFZ Centrala (Selenium): {len(all_art)}")
-    return all_art
+    def __call__(self, driver) -> bool:
+        probe = driver.execute_script(_JS_READY_PROBE, self.css)
+        stable = probe == self.last and probe[0] > 0 and probe[2] != "loading"
+        self.last = probe
+        return stable
 
 
-# ──────────────────────────────────────────────────────────
-# NFZ Oddziały
-# ──────────────────────────────────────────────────────────
-def _extract_nfz_oddzialy(soup: BeautifulSoup) -> list[dict]:
-    boxes = soup.select("div.padding-left-40")
-    if not boxes:
-        boxes = soup.select("div.news-item, li.news")
-    out = []
-    for box in boxes:
+def _wait_page_ready(driver, css: str, timeout: float = 5.0):
+    with _timed_wait("lista+sieć stabilne"):
         try:
-            a = box.select_one("h3.title a, h2.title a, .title a, h3 a, a")
-            if not a:
-                continue
-            title = a.get_text(strip=True) or "Aktualizacja NFZ Oddziały"
-            href = (a.get("href") or "").strip()
-            if href and not href.startswith("http"):
-                href = "https://www.nfz.gov.pl" + href
-            date_el = box.select_one("div.date, span.date, time")
-            date_str = _date_from_el(date_el)
-            if date_str and not _is_recent(date_str):
-                continue
-            out.append({"title": title, "url": href,
-                        "date": date_str or datetime.today().strftime("%Y-%m-%d"),
-                        "source": "NFZ Oddziały"})
+            WebDriverWait(driver, timeout, poll_frequency=0.15).until(_ProbeStable(css))
         except Exception:
-            continue
-    return out
+            pass   # po timeoucie bierzemy to, co jest
 
 
-def parse_nfz_oddzialy_articles() -> list[dict]:
-    print("▶ NFZ Oddziały")
-    url = "https://www.nfz.gov.pl/aktualnosci/aktualnosci-oddzialow/"
-
-    soup = _fetch(url)
-    if soup:
-        found = _extract_nfz_oddzialy(soup)
-        if found:
-            print(f"✅ NFZ Oddziały (BS4): {len(found)}")
-            return found
-        print("  BS4: brak elementów → Selenium")
-
-    soup = _soup_from_selenium(url, "div.padding-left-40, div.news-item")
-    found = _extract_nfz_oddzialy(soup) if soup else []
-    print(f"✅ NFZ Oddziały (Selenium): {len(found)}")
-    return found
+def _dismiss_cookies(driver, timeout: float = 3.0):
+    """Wołane po pojawieniu się listy: jedno sprawdzenie banera, czekanie tylko gdy jest."""
+    with _timed_wait("baner cookies"):
+        try:
+            btns = [b for b in driver.find_elements(By.XPATH, " | ".join(_COOKIE_XPATHS)) if b.is_displayed()]
+            if not btns:
+                return   # brak banera — bez czekania
+            btns[0].click()
+            WebDriverWait(driver, timeout, poll_frequency=0.1).until(EC.invisibility_of_element(btns[0]))
+        except Exception:
+            pass
+
+
+def _print_wait_stats():
+    for name, times in _wait_stats.items():
+        print(f"⏳ Selenium {name}: {len(times)}×, śr. {sum(times) / len(times) * 1000:.0f} ms, "
+              f"max {max(times) * 1000:.0f} ms")
+
+
+def _soup_from_selenium(url: str, wait_css: str, wait_sec: int = 20,
+                        cookies: bool = False) -> BeautifulSoup | None:
+    with _browser_pool.driver() as driver:
+        try:
+            driver.get(url)
+            with _timed_wait("pierwszy element"):
+                WebDriverWait(driver, wait_sec).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, wait_css))
+                )
+            if cookies:
+                _dismiss_cookies(driver)
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight/4);")
+            _wait_page_ready(driver, wait_css)
+            return _make_soup(driver.page_source)
+        except Exception as e:
+            print(f"  Selenium błąd ({url}): {e}")
+            return None
 
 
 # ──────────────────────────────────────────────────────────
-# gov.pl / MZ (Ministerstwo Zdrowia)
+# Rejestr źródeł — deklaratywne specyfikacje
+#   items     : grupy selektorów elementów listy; wygrywa pierwsza, która coś znajdzie
+#   link/title/lead/date : selektory pól (jeden CSS; pierwszy trafiony w kolejności dokumentu)
+#               title/lead mogą być listą — grupy w kolejności priorytetu, jak items
+#   parse_only: SoupStrainer — budujemy tylko poddrzewa czytane przez selektory
+#   filter_recent / require_date / date_in_text / min_title_len : reguły dat i tytułów
+#   selenium  : fallback (CSS, na który czekamy; timeout; czy zamykać baner cookies)
+# Nowe źródło = nowy wpis tutaj, bez własnej pętli ekstrakcji.
 # ──────────────────────────────────────────────────────────
-def _extract_govpl(soup: BeautifulSoup) -> list[dict]:
-    """
-    gov.pl /web/zdrowie/wiadomosci — artykuły mają .title + .intro + .date.
-    Elementy nawigacji ich nie mają → odrzucamy wszystko bez daty lub bez intro.
-    """
-    out = []
-    seen: set[str] = set()
+_DATE_SEL = "time, .date, .entry-date, .pub-date, .article-date, .news-date, span.time"
+
+
+def _class_strainer(tags: list[str], *classes: str) -> SoupStrainer:
+    """Strainer po klasie, odporny na wiele klas w atrybucie: nowsze bs4 (np. 4.15) porównują
+    przy parse_only surowy napis class ("news row"), więc class_="news" gubiłby taki element."""
+    alt = "|".join(re.escape(c) for c in classes)
+    return SoupStrainer(tags, class_=re.compile(rf"(^|\s)({alt})(\s|$)"))
+
+
+SOURCES: list[dict] = [
+    {
+        "key": "nfz_centrala",
+        "name": "NFZ Centrala",
+        "url": "https://www.nfz.gov.pl/aktualnosci/aktualnosci-centrali/",
+        "pages": 3,
+        "items": ["div.news, li.news, article.news"],
+        "link": ".title a, h3 a, h2 a, a",
+        "date": ".date, span.date, time",
+        "filter_recent": True,
+        "parse_only": _class_strainer(["div", "li", "article"], "news"),
+        "selenium": {"wait_css": "div.news, li.news"},
+    },
+    {
+        "key": "nfz_oddzialy",
+        "name": "NFZ Oddziały",
+        "url": "https://www.nfz.gov.pl/aktualnosci/aktualnosci-oddzialow/",
+        "items": ["div.padding-left-40", "div.news-item, li.news"],
+        "link": "h3.title a, h2.title a, .title a, h3 a, a",
+        "date": "div.date, span.date, time",
+        "filter_recent": True,
+        "parse_only": _class_strainer(["div", "li"], "padding-left-40", "news-item", "news"),
+        "selenium": {"wait_css": "div.padding-left-40, div.news-item"},
+    },
+    {
+        # artykuły mają .title + .intro + .date; elementy nawigacji ich nie mają
+        # → odrzucamy wszystko bez daty i z krótkim tytułem
+        "key": "govpl",
+        "name": "gov.pl",
+        "url": "https://www.gov.pl/web/zdrowie/wiadomosci",
+        "items": ["ul li, article, div.article-list-item"],
+        "link": "a[href]",
+        "title": ".title, h3, h2, h4",
+        "lead": ".intro, .description, .lead, p",
+        "date": ".date, time[datetime], span.date, .timestamp",
+        "filter_recent": True,
+        "require_date": True,
+        "min_title_len": 20,
+        "fallback_title": "Aktualizacja MZ",
+        "parse_only": SoupStrainer(["ul", "article"]),
+        "selenium": {"wait_css": "ul > li, article", "wait_sec": 25},
+    },
+    {
+        "key": "serwiszoz",
+        "name": "SerwisZOZ",
+        "url": "https://serwiszoz.pl/aktualnosci-prawne-86",
+        "items": ["#yw0 .items article, #yw0 article",
+                  ".list-view .items article, .items article, article",
+                  "div.item, .blog-item"],
+        "link": "h1 a, h2 a, h3 a, h4 a, .item-title a, .title a, a[href]",
+        # priorytet, nie kolejność dokumentu: nagłówek kategorii (h4) bywa przed tytułem (h2)
+        "title": ["h2", "h3", "h4", ".item-title", ".title"],
+        "lead": ".lead, .excerpt, p",
+        "lead_from_title": True,
+        "date": _DATE_SEL,
+        "date_in_text": True,
+        "parse_only": SoupStrainer(id="yw0"),
+        "selenium": {"wait_css": "#yw0, .list-view, .items, article, div.item",
+                     "wait_sec": 30, "cookies": True},
+    },
+    {
+        "key": "rynekzdrowia",
+        "name": "Rynek Zdrowia",
+        "url": "https://www.rynekzdrowia.pl/Aktualnosci/",
+        "items": ["div.box-4, ul.list-2 li, ul.list-4 li",
+                  "article.article-item, li.article, .article"],
+        "link": "a[href]",
+        "title": "div.desc h3, div.desc h2, h3, h2, .title",
+        "title_attr": "title",
+        "lead_from_title": True,
+        "date": _DATE_SEL,
+        "parse_only": _class_strainer(["div", "ul"], "box-4", "list-2", "list-4"),
+        "selenium": {"wait_css": "div.box-4, ul.list-2 li, ul.list-4 li, article"},
+    },
+]
+
+
+def _compile_source(spec: dict) -> dict:
+    """Kompiluje selektory raz, przy imporcie modułu."""
+    src = dict(spec)
+    src["_items"] = [sv.compile(sel) for sel in spec["items"]]
+    for field in ("link", "date"):
+        src["_" + field] = sv.compile(spec[field]) if spec.get(field) else None
+    for field in ("title", "lead"):   # lista grup priorytetu; pojedynczy CSS = jedna grupa
+        sels = spec.get(field) or []
+        src["_" + field] = [sv.compile(sel) for sel in ([sels] if isinstance(sels, str) else sels)] or None
+    src.setdefault("pages", 1)
+    src.setdefault("fallback_title", f"Aktualizacja {spec['name']}")
+    return src
+
+
+_SOURCES_BY_KEY: dict[str, dict] = {spec["key"]: _compile_source(spec) for spec in SOURCES}
+
+# liczba elementów listy i zapytań CSS per źródło (fan-out selektorów)
+_selector_stats: Counter = Counter()
+
+
+def _abs_url(href: str, base: str) -> str:
+    h = (href or "").strip()
+    if not h or h.startswith("#"):
+        return ""
+    return urljoin(base, h)
+
+
+def _first_text(src: dict, field: str, el, sep: str = "") -> str:
+    """Pierwsza grupa z niepustym tekstem wygrywa; w grupie — kolejność dokumentu."""
+    for matcher in src["_" + field] or []:
+        _selector_stats[src["key"] + ":css"] += 1
+        for node in matcher.select(el):
+            txt = node.get_text(sep, strip=True)
+            if txt:
+                return txt
+    return ""
+
+
+def _item_date(src: dict, el) -> str | None:
+    _selector_stats[src["key"] + ":css"] += 1
+    for node in src["_date"].select(el):
+        parsed = _date_from_el(node)
+        if parsed:
+            return parsed
+    if src.get("date_in_text"):
+        txt = el.get_text(" ", strip=True)
+        return _parse_date_str(txt) if txt else None
+    return None
 
-    # Szukamy list-itemów z pełnym zestawem pól artykułu
-    for li in soup.select("ul li, article, div.article-list-item"):
+
+def _extract_items(src: dict, soup: BeautifulSoup, keep_old: bool = False) -> list[dict]:
+    """keep_old=True zostawia stare wpisy — crawl używa ich jako sygnału końca paginacji."""
+    items = []
+    for matcher in src["_items"]:
+        _selector_stats[src["key"] + ":css"] += 1
+        items = matcher.select(soup)
+        if items:
+            break
+    _selector_stats[src["key"] + ":items"] += len(items)
+
+    today = datetime.today().strftime("%Y-%m-%d")
+    seen: set[str] = set()
+    out = []
+    for it in items:
         try:
-            # data jest wymagana — bez niej to menu/nav, nie artykuł
-            date_el = li.select_one(".date, time[datetime], span.date, .timestamp")
-            if not date_el:
-                continue
-            date_str = _date_from_el(date_el)
-            if not date_str:
+            date_str = _item_date(src, it)
+            if src.get("require_date") and not date_str:
                 continue
-            if not _is_recent(date_str):
+            if src.get("filter_recent") and not keep_old and not _is_recent(date_str):
                 continue
 
-            a = li.select_one("a[href]")
+            _selector_stats[src["key"] + ":css"] += 1
+            a = src["_link"].select_one(it)
             if not a:
                 continue
-            href = (a.get("href") or "").strip()
-            if not href or href.startswith("#") or href in seen:
+            href = _abs_url(a.get("href", ""), src["url"])
+            if not href or href in seen:
                 continue
-            if not href.startswith("http"):
-                href = "https://www.gov.pl" + href
             seen.add(href)
 
-            title_el = li.select_one(".title, h3, h2, h4")
-            title = (title_el.get_text(strip=True) if title_el
-                     else a.get_text(strip=True)) or "Aktualizacja MZ"
-            # pomiń placeholder-tytuły i nagłówki sekcji nav
-            if len(title) < 20:
+            title = _first_text(src, "title", it)
+            if not title and src.get("title_attr"):
+                title = (a.get(src["title_attr"]) or "").strip()
+            title = title or a.get_text(strip=True) or src["fallback_title"]
+            if len(title) < src.get("min_title_len", 0):
                 continue
 
-            intro_el = li.select_one(".intro, .description, .lead, p")
-            intro = intro_el.get_text(" ", strip=True) if intro_el else ""
-
-            out.append({"title": title, "lead": intro, "url": href,
-                        "date": date_str, "source": "gov.pl"})
-        except Exception:
+            rec = {"title": title, "url": href, "date": date_str or today, "source": src["name"]}
+            if src["_lead"] is not None or src.get("lead_from_title"):
+                lead = _first_text(src, "lead", it, " ")
+                rec["lead"] = lead or (title if src.get("lead_from_title") else "")
+            out.append(rec)
+        except Exception as e:
+            print(f"  ⚠️ {src['name']} element: {e}")
             continue
     return out
 
 
-def get_recent_gov_mz_articles() -> list[dict]:
-    print("▶ gov.pl / MZ")
-    url = "https://www.gov.pl/web/zdrowie/wiadomosci"
-
-    soup = _fetch(url)
-    if soup:
-        found = _extract_govpl(soup)
-        if found:
-            print(f"✅ gov.pl (BS4): {len(found)}")
-            return found
-        print("  BS4: brak elementów → Selenium")
-
-    soup = _soup_from_selenium(url, "ul > li, article", wait_sec=25)
-    found = _extract_govpl(soup) if soup else []
-    print(f"✅ gov.pl (Selenium): {len(found)}")
+def _extract_from(html: str, src: dict, keep_old: bool = False) -> list[dict]:
+    found = _extract_items(src, _make_soup(html, src.get("parse_only")), keep_old)
+    if not found and src.get("parse_only") is not None:
+        # strainer nie trafił w (zmieniony?) layout → pełne drzewo
+        found = _extract_items(src, _make_soup(html), keep_old)
     return found
 
 
-# ──────────────────────────────────────────────────────────
-# SerwisZOZ
-# ──────────────────────────────────────────────────────────
-def _abs_serwiszoz(href: str) -> str:
-    h = (href or "").strip()
-    if not h or h.startswith("#"):
-        return ""
-    if h.startswith("//"):
-        return "https:" + h
-    if h.startswith("/"):
-        return "https://serwiszoz.pl" + h
-    return h
-
-
-def _serwiszoz_date(el) -> str | None:
-    """Próbuje wyciągnąć datę z elementu listy SerwisZOZ."""
-    for sel in ["time", ".date", "span.date", "div.date", ".entry-date",
-                ".pub-date", ".article-date", ".news-date"]:
-        d = el.select_one(sel) if hasattr(el, "select_one") else None
-        if d:
-            parsed = _date_from_el(d)
-            if parsed:
-                return parsed
-    # szukaj wzorca daty w samym tekście elementu (dd.mm.yyyy)
-    txt = el.get_text(" ", strip=True) if hasattr(el, "get_text") else ""
-    return _parse_date_str(txt) if txt else None
-
-
-def _extract_serwiszoz(soup: BeautifulSoup) -> list[dict]:
-    containers = (soup.select("#yw0 .items article, #yw0 article")
-                  or soup.select(".list-view .items article, .items article, article")
-                  or soup.select("div.item, .blog-item"))
-    seen: set[str] = set()
-    out = []
-    for it in containers:
-        try:
-            a = it.select_one("h1 a, h2 a, h3 a, h4 a, .item-title a, .title a, a[href]")
-            if not a:
-                continue
-            href = _abs_serwiszoz(a.get("href", ""))
-            if not href or href in seen:
-                continue
-            seen.add(href)
+def _page_url(src: dict, page: int) -> str:
+    return src["url"] if page == 1 else f"{src['url']}?page={page}"
 
-            title = ""
-            for sel in ["h2", "h3", "h4", ".item-title", ".title"]:
-                el = it.select_one(sel)
-                if el and el.get_text(strip=True):
-                    title = el.get_text(strip=True)
-                    break
-            title = title or a.get_text(strip=True) or "Aktualizacja SerwisZOZ"
 
-            lead_el = it.select_one(".lead, .excerpt, p")
-            lead = lead_el.get_text(" ", strip=True) if lead_el else title
+def _split_recent(src: dict, found: list[dict]) -> tuple[list[dict], bool]:
+    """(wpisy do zwrócenia, czy strona sięga już starszych niż CUTOFF)."""
+    recent = [a for a in found if _is_recent(a.get("date"))]
+    reached_old = len(recent) < len(found)
+    return (recent if src.get("filter_recent") else found), reached_old
 
-            date_str = _serwiszoz_date(it) or datetime.today().strftime("%Y-%m-%d")
 
-            out.append({"title": title, "url": href, "lead": lead,
-                        "date": date_str, "source": "SerwisZOZ"})
-        except Exception:
-            continue
-    return out
+def _merge_known(found: list[dict], known: list[dict]) -> list[dict]:
+    urls = {a.get("url") for a in found}
+    return found + [a for a in known if a.get("url") not in urls]
 
 
-def _dismiss_cookies(driver):
-    for xp in [
-        "//button[contains(., 'Akceptuj wszystkie')]",
-        "//button[@id='cookiescript_accept']",
-        "//button[contains(., 'akceptuj')]",
-        "//button[@id='onetrust-accept-btn-handler']",
-    ]:
-        try:
-            driver.find_element(By.XPATH, xp).click()
-            time.sleep(0.8)
-            return
-        except Exception:
-            pass
+def crawl_source(key: str) -> list[dict]:
+    """Uniwersalny crawl jednego źródła: BS4 (z paginacją) → Selenium fallback."""
+    src = _SOURCES_BY_KEY[key]
+    name = src["name"]
+    print(f"▶ {name}")
+    known = _known_items(key)
+    known_urls = {a.get("url") for a in known}
+    all_art: list[dict] = []
+    bs4_items = False
 
+    def _page_done(found: list[dict], reached_old: bool, page: int) -> bool:
+        if not found or reached_old:
+            return True
+        if known_urls and any(a.get("url") in known_urls for a in found):
+            if page < src["pages"]:
+                print(f"  ↩️ {name}: strona {page} sięga znanych wpisów — koniec paginacji")
+            return True
+        return False
 
-def parse_serwiszoz_articles() -> list[dict]:
-    print("▶ SerwisZOZ")
-    url = "https://serwiszoz.pl/aktualnosci-prawne-86"
-
-    soup = _fetch(url)
-    if soup:
-        found = _extract_serwiszoz(soup)
-        if found:
-            print(f"✅ SerwisZOZ (BS4): {len(found)}")
-            return found
-        print("  BS4: brak elementów → Selenium")
-
-    driver = _get_driver()
-    try:
-        driver.get(url)
-        time.sleep(1.2)
-        _dismiss_cookies(driver)
-        WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located(
-                (By.CSS_SELECTOR, "#yw0, .list-view, .items, article, div.item"))
-        )
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight/4);")
-        time.sleep(0.8)
-        found = _extract_serwiszoz(BeautifulSoup(driver.page_source, "html.parser"))
-    except Exception as e:
-        print(f"❌ SerwisZOZ Selenium: {e}")
-        found = []
+    # BS4 primary
+    for page in range(1, src["pages"] + 1):
+        html = _fetch_html(_page_url(src, page))
+        if not html:
+            break
+        page_items = _extract_from(html, src, keep_old=True)
+        bs4_items = bs4_items or bool(page_items)
+        found, reached_old = _split_recent(src, page_items)
+        all_art.extend(found)
+        if _page_done(found, reached_old, page):
+            break
 
-    print(f"✅ SerwisZOZ (Selenium): {len(found)}")
-    return found
+    # strona się sparsowała, ale wszystko starsze niż CUTOFF — Selenium nic nie doda
+    if all_art or bs4_items:
+        new = sum(1 for a in all_art if a.get("url") not in known_urls)
+        all_art = _merge_known(all_art, known)
+        _update_crawl_state(key, all_art)
+        print(f"✅ {name} (BS4): {len(all_art)} (nowe: {new})")
+        return all_art
 
+    # Selenium fallback
+    print("  → Selenium fallback")
+    sel = src["selenium"]
+    for page in range(1, src["pages"] + 1):
+        soup = _soup_from_selenium(_page_url(src, page), sel["wait_css"],
+                                   wait_sec=sel.get("wait_sec", 20),
+                                   cookies=sel.get("cookies", False))
+        if not soup:
+            break
+        found, reached_old = _split_recent(src, _extract_items(src, soup, keep_old=True))
+        all_art.extend(found)
+        if _page_done(found, reached_old, page):
+            break
 
-# ──────────────────────────────────────────────────────────
-# Rynek Zdrowia
-# ──────────────────────────────────────────────────────────
-def _extract_rynekzdrowia(soup: BeautifulSoup) -> list[dict]:
-    items = (soup.select("div.box-4, ul.list-2 li, ul.list-4 li")
-             or soup.select("article.article-item, li.article, .article"))
-    seen: set[str] = set()
-    out = []
-    for item in items:
-        try:
-            a = item.select_one("a[href]")
-            if not a:
-                continue
-            href = (a.get("href") or "").strip()
-            if not href or href in seen:
-                continue
-            seen.add(href)
+    all_art = _merge_known(all_art, known)
+    _update_crawl_state(key, all_art)
+    print(f"✅ {name} (Selenium): {len(all_art)}")
+    return all_art
+
+
+def _print_selector_stats():
+    for key in _SOURCES_BY_KEY:
+        items = _selector_stats[key + ":items"]
+        css = _selector_stats[key + ":css"]
+        if items:
+            print(f"🔎 {key}: {items} el., {css} zapytań CSS ({css / items:.1f}/el.)")
 
-            title_el = item.select_one("div.desc h3, div.desc h2, h3, h2, .title")
-            title = (title_el.get_text(strip=True) if title_el else "")
-            if not title:
-                title = (a.get("title") or a.get_text(strip=True)
-                         or "Aktualizacja Rynek Zdrowia")
-
-            # data — próba kilku selektorów typowych dla tego portalu
-            date_str = None
-            for sel in ["time", ".date", "span.date", "div.date",
-                        ".pub-date", ".entry-date", "span.time", ".news-date"]:
-                d_el = item.select_one(sel)
-                if d_el:
-                    date_str = _date_from_el(d_el)
-                    if date_str:
-                        break
-            date_str = date_str or datetime.today().strftime("%Y-%m-%d")
-
-            out.append({"title": title, "url": href, "lead": title,
-                        "date": date_str, "source": "Rynek Zdrowia"})
-        except Exception as e:
-            print(f"  ⚠️ Rynek Zdrowia element: {e}")
-            continue
-    return out
+
+# Zachowane nazwy publiczne (wywołania z zewnątrz / ręczne testy)
+def parse_nfz_centrala_articles() -> list[dict]:
+    return crawl_source("nfz_centrala")
+
+
+def parse_nfz_oddzialy_articles() -> list[dict]:
+    return crawl_source("nfz_oddzialy")
+
+
+def get_recent_gov_mz_articles() -> list[dict]:
+    return crawl_source("govpl")
+
+
+def parse_serwiszoz_articles() -> list[dict]:
+    return crawl_source("serwiszoz")
 
 
 def parse_rynekzdrowia_articles() -> list[dict]:
-    print("▶ Rynek Zdrowia")
-    url = "https://www.rynekzdrowia.pl/Aktualnosci/"
-
-    soup = _fetch(url)
-    if soup:
-        found = _extract_rynekzdrowia(soup)
-        if found:
-            print(f"✅ Rynek Zdrowia (BS4): {len(found)}")
-            return found
-        print("  BS4: brak elementów → Selenium")
-
-    soup = _soup_from_selenium(url, "div.box-4, ul.list-2 li, ul.list-4 li, article")
-    found = _extract_rynekzdrowia(soup) if soup else []
-    print(f"✅ Rynek Zdrowia (Selenium): {len(found)}")
-    return found
+    return crawl_source("rynekzdrowia")
 
 
 # ──────────────────────────────────────────────────────────
 # Główny runner
 # ──────────────────────────────────────────────────────────
-def run_all_parsers():
-    print("\n🛠️ Uruchamianie parserów...")
-    all_articles: list[dict] = []
-
-    for fn in [
-        parse_nfz_centrala_articles,
-        parse_nfz_oddzialy_articles,
-        get_recent_gov_mz_articles,
-        parse_serwiszoz_articles,
-        parse_rynekzdrowia_articles,
-    ]:
-        try:
-            all_articles.extend(fn())
-        except Exception as e:
-            print(f"❌ {fn.__name__}: {e}")
-            traceback.print_exc()
-
-    _quit_driver()  # Chrome zamykany raz na końcu
-
-    # deduplikacja po (title, url)
-    seen: set[tuple] = set()
-    unique = []
-    for a in all_articles:
-        key = (a.get("title", "").strip(), a.get("url", "").strip())
-        if key not in seen:
-            seen.add(key)
+def _run_source(key: str) -> list[dict]:
+    try:
+        return crawl_source(key)
+    except Exception as e:
+        print(f"❌ {key}: {e}")
+        traceback.print_exc()
+        return []
+
+
+# ──────────────────────────────────────────────────────────
+# Deduplikacja między źródłami: kanoniczny URL + klastry podobnych tytułów (MinHash/LSH).
+# Ten sam komunikat NFZ przedrukowany przez Rynek Zdrowia / SerwisZOZ zostaje jednym
+# kandydatem; reprezentantem jest wpis ze źródła wyżej w SOURCES (oficjalne pierwsze),
+# pozostałe URL-e trafiają do jego pola "duplicates".
+# Łączymy tylko wpisy z różnych źródeł i tylko przy tych samych liczbach w tytule
+# (nr zarządzenia, daty) — „nr 12/2026” i „nr 13/2026” to dwa różne komunikaty.
+# LSH daje kandydatów, o połączeniu decyduje dokładny Jaccard shingli.
+# ──────────────────────────────────────────────────────────
+PARSER_DUP_THRESHOLD = float(os.getenv("PARSER_DUP_THRESHOLD", "0.6"))
+_MINHASH_PERMS = 64
+_LSH_BANDS = 16            # 16 pasm × 4 wiersze
+_MINHASH_PRIME = (1 << 61) - 1
+_MINHASH_COEFS = [((i * 0x9E3779B97F4A7C15 + 1) % _MINHASH_PRIME | 1,
+                   (i * 0xC2B2AE3D27D4EB4F + 7) % _MINHASH_PRIME) for i in range(_MINHASH_PERMS)]
+_PL_FOLD = str.maketrans("ąćęłńóśźż", "acelnoszz")
+_STOPWORDS = {"w", "z", "na", "do", "i", "o", "od", "po", "dla", "się", "sie", "oraz", "jest",
+              "co", "to", "a", "we", "ze", "przez", "jak", "czy", "nie", "r"}
+
+
+def _title_shingles(title: str) -> set[str]:
+    words = re.findall(r"\w+", (title or "").lower().translate(_PL_FOLD))
+    # prosty stemming: rdzeń = pierwsze 6 znaków (odmiana polskich rzeczowników)
+    norm = " ".join(w[:6] for w in words if w not in _STOPWORDS)
+    return {norm[i:i + 4] for i in range(max(0, len(norm) - 3))}
+
+
+def _title_numbers(title: str) -> frozenset[str]:
+    return frozenset(n.lstrip("0") or "0" for n in re.findall(r"\d+", title or ""))
+
+
+def _minhash(shingles: set[str]) -> tuple[int, ...]:
+    hashes = [int.from_bytes(hashlib.blake2b(sh.encode("utf-8"), digest_size=8).digest(), "big")
+              for sh in shingles]
+    return tuple(min((a * h + b) % _MINHASH_PRIME for h in hashes) for a, b in _MINHASH_COEFS)
+
+
+class _Deduper:
+    """Przyrostowa deduplikacja — działa na partiach z iter_articles i na pełnej liście."""
+
+    def __init__(self, threshold: float = PARSER_DUP_THRESHOLD):
+        self.threshold = threshold
+        self.urls: dict[str, dict] = {}
+        self.buckets: dict[tuple, list[int]] = {}
+        self.kept: list[tuple[set[str], frozenset[str], dict]] = []
+        self.merged = 0
+
+    def _similar(self, sig: tuple, shingles: set[str], a: dict) -> dict | None:
+        rows = _MINHASH_PERMS // _LSH_BANDS
+        source = a.get("source")
+        numbers = _title_numbers(a.get("title", ""))
+        seen = set()
+        for band in range(_LSH_BANDS):
+            for idx in self.buckets.get((band, sig[band * rows:(band + 1) * rows]), []):
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                other_shingles, other_numbers, other = self.kept[idx]
+                if source and source == other.get("source"):
+                    continue   # to samo źródło = osobne ogłoszenia
+                if numbers != other_numbers:
+                    continue
+                if len(shingles & other_shingles) / len(shingles | other_shingles) >= self.threshold:
+                    return other
+        return None
+
+    def _remember(self, sig: tuple, shingles: set[str], a: dict):
+        rows = _MINHASH_PERMS // _LSH_BANDS
+        self.kept.append((shingles, _title_numbers(a.get("title", "")), a))
+        for band in range(_LSH_BANDS):
+            self.buckets.setdefault((band, sig[band * rows:(band + 1) * rows]), []).append(len(self.kept) - 1)
+
+    def filter(self, articles: list[dict]) -> list[dict]:
+        unique = []
+        for a in articles:
+            url = (a.get("url") or "").strip()
+            key = normalize_url(url) or a.get("title", "").strip()
+            if key in self.urls:
+                continue
+            shingles = _title_shingles(a.get("title", ""))
+            sig = _minhash(shingles) if shingles else None
+            rep = self._similar(sig, shingles, a) if sig else None
+            if rep is not None:
+                self.merged += 1
+                self.urls[key] = rep
+                if url and url != rep.get("url"):
+                    rep.setdefault("duplicates", []).append(url)
+                continue
+            self.urls[key] = a
+            if sig:
+                self._remember(sig, shingles, a)
             unique.append(a)
+        return unique
+
 
+def iter_articles(concurrent: bool | None = None, workers: int | None = None,
+                  dedupe: bool = True):
+    """Generator (klucz źródła, rekordy) w kolejności kończenia się źródeł —
+    konsument może działać, zanim wolniejsze źródła (np. Selenium) skończą."""
+    print("\n🛠️ Uruchamianie parserów...")
+    concurrent = PARSER_CONCURRENT if concurrent is None else concurrent
+    workers = (workers or PARSER_WORKERS) if concurrent else 1
+    deduper = _Deduper()
+    t0 = time.monotonic()
+
+    try:
+        if workers > 1:
+            # fetch BS4 równolegle; Selenium ograniczony rozmiarem puli (PARSER_BROWSERS)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parser") as ex:
+                futures = {ex.submit(_run_source, key): key for key in _SOURCES_BY_KEY}
+                for fut in as_completed(futures):
+                    found = fut.result()
+                    yield futures[fut], (deduper.filter(found) if dedupe else found)
+        else:
+            for key in _SOURCES_BY_KEY:
+                found = _run_source(key)
+                yield key, (deduper.filter(found) if dedupe else found)
+    finally:
+        _browser_pool.close()  # Chrome zamykany raz na końcu
+        _save_crawl_state()
+
+    print(f"⏱️ Crawl: {time.monotonic() - t0:.1f}s (wątki: {workers})")
+    _print_http_stats()
+    _print_selector_stats()
+    _print_wait_stats()
+    if deduper.merged:
+        print(f"🧬 Duplikaty między źródłami: {deduper.merged} połączonych")
+
+
+def crawl_articles(concurrent: bool | None = None, workers: int | None = None) -> list[dict]:
+    """API biblioteczne: crawl wszystkich źródeł → lista rekordów (bez zapisu na dysk)."""
+    by_key = dict(iter_articles(concurrent, workers, dedupe=False))
+    ordered = [a for key in _SOURCES_BY_KEY for a in by_key.get(key, [])]   # kolejność jak w SOURCES
+    deduper = _Deduper()
+    unique = deduper.filter(ordered)
+    if deduper.merged:
+        print(f"🧬 Duplikaty między źródłami: {deduper.merged} połączonych")
+    return unique
+
+
+def run_all_parsers(concurrent: bool | None = None, workers: int | None = None):
+    unique = crawl_articles(concurrent, workers)
     out = Path("all_articles_combined.json")
     out.write_text(json.dumps(unique, ensure_ascii=False, indent=2), encoding="utf-8")
     print(f"\n✅ Zapisano {len(unique)} artykułów → {out}")
 
 
 if __name__ == "__main__":
-    run_all_parsers()
+    if "--serve-browser" in sys.argv:
+        _serve_browser()
+    else:
+        run_all_parsers()
@@ -0,0 +1,32 @@
+"""
+Harmonogram etapów jednego artykułu jako mały DAG: etap startuje, gdy gotowe są jego
+zależności, więc niezależne gałęzie (np. research i H1 → meta → obraz) biegną równolegle.
+Wspólny dla generatora aktualności i blog_generator.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def run_stages(stages: dict) -> dict:
+    """stages: nazwa → (zależności, funkcja(**wyniki_zależności)). Zwraca wyniki wszystkich etapów.
+    Wyjątek etapu przerywa cały artykuł (etapy zależne nie ruszają)."""
+    for name, (deps, _) in stages.items():
+        missing = [d for d in deps if d not in stages]
+        if missing:
+            raise ValueError(f"Etap {name}: nieznane zależności {missing}")
+
+    results: dict = {}
+    pending = dict(stages)
+    running: dict = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(stages))) as pool:
+        while pending or running:
+            for name, (deps, fn) in list(pending.items()):
+                if all(d in results for d in deps):
+                    running[pool.submit(fn, **{d: results[d] for d in deps})] = name
+                    del pending[name]
+            if not running:
+                raise ValueError(f"Cykl zależności między etapami: {sorted(pending)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                results[running.pop(fut)] = fut.result()
+    return results
@@ -0,0 +1,36 @@
+"""
+Kanoniczna postać URL — wspólna dla parsera (dedupe źródeł) i pipeline'u (dedupe z WP).
+http/https, www., końcowy slash, fragment i parametry śledzące nie odróżniają artykułów.
+"""
+
+from html import unescape
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+_TRACKING_PREFIXES = ("utm_", "pk_", "mtm_")
+_TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+                    "_ga", "_gl", "ref"}
+
+
+def normalize_url(url: str) -> str:
+    """Klucz porównania, nie adres do otwierania (schemat jest pomijany)."""
+    u = unescape((url or "").strip())
+    if not u:
+        return ""
+    if u.startswith("//"):
+        u = "https:" + u
+    elif "://" not in u:
+        u = "https://" + u
+    parts = urlsplit(u)
+
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip("/")
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in _TRACKING_PARAMS and not k.lower().startswith(_TRACKING_PREFIXES)
+    )
+    return host + path + ("?" + urlencode(query) if query else "")
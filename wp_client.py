@@ -0,0 +1,319 @@
+"""
+Klient WordPress REST API wspólny dla pipeline'u: jedna sesja keep-alive z pulą połączeń,
+Application Password, ponawianie z wykładniczym backoffem (z jitterem) na 429/5xx
+i zapamiętana strategia wysyłki posta (JSON → JSON jako bajty → formularz).
+
+Metadane WP (ID kategorii/tagów, hash treści obrazu → media, strategia wysyłki) trzymane są
+w pliku WP_META_CACHE_PATH z TTL — na persistent disk przeżywają restarty Render.
+
+Wiele postów naraz: create_posts() wysyła je przez /wp-json/batch/v1 (po WP_BATCH_MAX),
+gdy witryna to obsługuje, a inaczej równolegle pojedynczo.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from diskstore import write_json_atomic
+
+load_dotenv("bot.env")
+
+WP_POOL_SIZE = max(2, int(os.getenv("WP_POOL_SIZE", "8")))
+WP_RETRIES = max(0, int(os.getenv("WP_RETRIES", "3")))
+WP_BACKOFF_SEC = float(os.getenv("WP_BACKOFF_SEC", "1.0"))
+WP_META_CACHE_PATH = os.getenv("WP_META_CACHE_PATH", "wp_meta_cache.json").strip()   # pusty = tylko w pamięci
+WP_META_CACHE_DAYS = float(os.getenv("WP_META_CACHE_DAYS", "30"))
+WP_BATCH_MAX = max(1, int(os.getenv("WP_BATCH_MAX", "25")))   # domyślny limit WP na jedno żądanie batch
+WP_PUBLISH_WORKERS = max(1, int(os.getenv("WP_PUBLISH_WORKERS", "4")))
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+# POST nie jest idempotentny: ponawiamy tylko, gdy serwer na pewno go nie przetworzył
+_RETRY_STATUS_POST = {429, 503}
+# odpowiedzi, po których hosty z filtrami (WAF/mod_security) przyjmują inną postać body
+_FALLBACK_STATUS = (400, 403, 404, 406, 415, 500)
+POST_STRATEGIES = ("json", "json_bytes", "form")
+# błędy treści (nieistniejąca kategoria/media), nie kodowania body — zmiana strategii nic nie da
+_PAYLOAD_ERRORS = ("rest_invalid_param", "rest_invalid_featured_media", "rest_term_invalid")
+
+
+def _error_code(resp: requests.Response) -> str:
+    return _body_code(_json_body(resp))
+
+
+def _json_body(resp: requests.Response):
+    try:
+        return resp.json()
+    except ValueError:
+        return {"message": (resp.text or "")[:600]}
+
+
+def _body_code(body) -> str:
+    return (body.get("code") or "") if isinstance(body, dict) else ""
+
+
+def _fold(name: str) -> str:
+    """Porównanie nazw terminów: bez wielkości liter i polskich znaków (Aktualności = aktualnosci)."""
+    norm = unicodedata.normalize("NFKD", (name or "").strip().casefold()).replace("ł", "l")
+    return "".join(c for c in norm if not unicodedata.combining(c))
+
+
+class _MetaCache:
+    """{rodzaj: {klucz: {"value", "at"}}} dla jednej witryny; zapis atomowy po każdej zmianie."""
+
+    def __init__(self, path: str, site: str, ttl_days: float):
+        self.path = Path(path) if path else None
+        self.site = site
+        self.ttl = ttl_days * 86400
+        self._lock = threading.Lock()
+        self.entries: dict[str, dict] = {}
+        if self.path:
+            try:
+                raw = json.loads(self.path.read_text(encoding="utf-8"))
+                if raw.get("site") == site:   # inna witryna = inne ID
+                    self.entries = raw.get("entries", {})
+            except (OSError, ValueError):
+                pass
+
+    def get(self, kind: str, key: str):
+        entry = self.entries.get(kind, {}).get(key)
+        if not entry or time.time() - entry.get("at", 0) > self.ttl:
+            return None
+        return entry["value"]
+
+    def put(self, kind: str, key: str, value):
+        with self._lock:
+            self.entries.setdefault(kind, {})[key] = {"value": value, "at": time.time()}
+            self._save()
+
+    def invalidate(self, kind: str, match) -> int:
+        """Usuwa wpisy rodzaju, dla których match(value) jest prawdziwe."""
+        with self._lock:
+            stale = [k for k, e in self.entries.get(kind, {}).items() if match(e["value"])]
+            for k in stale:
+                del self.entries[kind][k]
+            if stale:
+                self._save()
+        return len(stale)
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            write_json_atomic(self.path, {"site": self.site, "entries": self.entries})
+        except OSError as e:
+            print(f"⚠️ Cache metadanych WP zapis: {e}", flush=True)
+
+
+class WPClient:
+    def __init__(self, base_url: str, user: str, app_password: str):
+        self.base_url = (base_url or "").rstrip("/")
+        self.auth = (user, app_password) if (user and app_password) else None
+        self.meta = _MetaCache(WP_META_CACHE_PATH, self.base_url, WP_META_CACHE_DAYS)
+        # ustalana przy pierwszym udanym poście, pamiętana między runami
+        self.post_strategy: str | None = self.meta.get("strategy", "post")
+        self.stats = {"żądania": 0, "ponowienia": 0}
+        self._session: requests.Session | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.base_url and self.auth)
+
+    def endpoint(self, route: str) -> str:
+        """"posts" → {WP_URL}/wp-json/wp/v2/posts; pełny URL zwracany bez zmian."""
+        if route.startswith("http"):
+            return route
+        if route.startswith("/"):
+            return f"{self.base_url}/wp-json{route}"
+        return f"{self.base_url}/wp-json/wp/v2/{route}"
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is not None:
+            return self._session
+        with self._lock:
+            if self._session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=WP_POOL_SIZE)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                s.auth = self.auth
+                s.headers.update({
+                    "Accept": "application/json",
+                    "Cache-Control": "no-cache",
+                    "Pragma": "no-cache",
+                    "User-Agent": "GenesManager/1.0 (+requests)",
+                })
+                self._session = s
+        return self._session
+
+    def _delay(self, attempt: int, resp: requests.Response | None) -> float:
+        retry_after = resp.headers.get("Retry-After") if resp is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), 60.0)
+        # full jitter: losowo z [0, base * 2^attempt]
+        return random.uniform(0, WP_BACKOFF_SEC * (2 ** attempt))
+
+    def request(self, method: str, route: str, timeout: float = 30, **kwargs) -> requests.Response:
+        """Żądanie z ponowieniami; zwraca ostatnią odpowiedź (status sprawdza wywołujący)."""
+        url = self.endpoint(route)
+        retry_status = _RETRY_STATUS if method.upper() in ("GET", "HEAD") else _RETRY_STATUS_POST
+        body = kwargs.get("data")
+        for attempt in range(WP_RETRIES + 1):
+            if attempt and hasattr(body, "seek"):
+                body.seek(0)   # strumień pliku przy ponowieniu od początku
+            self.stats["żądania"] += 1
+            try:
+                resp = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # POST bez odpowiedzi mógł zostać przetworzony — ponawiamy tylko nieudane połączenie
+                if attempt == WP_RETRIES or (retry_status is _RETRY_STATUS_POST
+                                             and not isinstance(e, requests.ConnectTimeout)):
+                    raise
+                print(f"⚠️ WP {method} {route}: {e} — ponawiam", flush=True)
+                resp = None
+            else:
+                if resp.status_code not in retry_status or attempt == WP_RETRIES:
+                    return resp
+                print(f"⚠️ WP {method} {route}: HTTP {resp.status_code} — ponawiam", flush=True)
+            self.stats["ponowienia"] += 1
+            time.sleep(self._delay(attempt, resp))
+        raise RuntimeError("nieosiągalne")
+
+    def get(self, route: str, **kwargs) -> requests.Response:
+        return self.request("GET", route, **kwargs)
+
+    def post(self, route: str, **kwargs) -> requests.Response:
+        return self.request("POST", route, **kwargs)
+
+    def _post_as(self, strategy: str, route: str, payload: dict) -> requests.Response:
+        if strategy == "json":
+            return self.post(route, json=payload,
+                             headers={"Content-Type": "application/json; charset=UTF-8"})
+        if strategy == "json_bytes":
+            return self.post(route, data=json.dumps(payload).encode("utf-8"),
+                             headers={"Content-Type": "application/json; charset=UTF-8"})
+        # formularz przenosi tylko proste pola
+        form = {k: payload[k] for k in ("title", "content", "status") if k in payload}
+        return self.post(route, data=form,
+                         headers={"Content-Type": "application/x-www-form-urlencoded; charset=UTF-8"})
+
+    def create_post(self, payload: dict, route: str = "posts") -> requests.Response:
+        """Najpierw strategia, która ostatnio zadziałała; przy odrzuceniu kolejne z POST_STRATEGIES."""
+        order = list(POST_STRATEGIES)
+        if self.post_strategy in order:
+            order.remove(self.post_strategy)
+            order.insert(0, self.post_strategy)
+        resp = None
+        for strategy in order:
+            resp = self._post_as(strategy, route, payload)
+            if resp.status_code == 201:
+                if strategy != self.post_strategy:
+                    print(f"🔧 WP: strategia wysyłki postów → {strategy}", flush=True)
+                    self.meta.put("strategy", "post", strategy)
+                self.post_strategy = strategy
+                return resp
+            if resp.status_code not in _FALLBACK_STATUS or _error_code(resp) in _PAYLOAD_ERRORS:
+                return resp
+        return resp
+
+    def supports_batch(self) -> bool:
+        """Czy witryna ma /wp-json/batch/v1 (WP ≥ 5.6); wynik w cache metadanych."""
+        known = self.meta.get("capability", "batch_v1")
+        if known is not None:
+            return known
+        try:
+            resp = self.get("/", params={"_fields": "routes"}, timeout=20)
+            body = _json_body(resp)
+            ok = resp.status_code == 200 and isinstance(body, dict) and "/batch/v1" in (body.get("routes") or {})
+        except Exception as e:
+            print(f"⚠️ WP: nie udało się sprawdzić batch API: {e}", flush=True)
+            return False
+        self.meta.put("capability", "batch_v1", ok)
+        return ok
+
+    def _batch(self, route: str, payloads: list[dict]) -> list[tuple[int, dict]] | None:
+        """Jedno żądanie batch. None = nic nie zostało wykonane (można wysłać pojedynczo)."""
+        resp = self.post("/batch/v1", json={
+            # każdy wpis walidowany osobno — zły post ma własny błąd w responses, reszta powstaje
+            "validation": "normal",
+            "requests": [{"method": "POST", "path": f"/wp/v2/{route}", "body": p} for p in payloads],
+        }, timeout=120)
+        body = _json_body(resp)
+        body = body if isinstance(body, dict) else {}
+        if resp.status_code not in (200, 207):
+            print(f"⚠️ WP batch odrzucony ({resp.status_code} {_body_code(body)}) "
+                  f"— wysyłam pojedynczo", flush=True)
+            return None
+        out = [(r.get("status", 0), r.get("body") or {}) for r in (body.get("responses") or [])[:len(payloads)]]
+        # batch już wykonany — brakujących odpowiedzi nie ponawiamy (ryzyko duplikatu)
+        out += [(0, {"message": "brak odpowiedzi w batch"})] * (len(payloads) - len(out))
+        return out
+
+    def create_posts(self, payloads: list[dict], route: str = "posts") -> list[tuple[int, dict]]:
+        """(status, body) dla każdego payloadu, w tej samej kolejności."""
+        results: list[tuple[int, dict] | None] = [None] * len(payloads)
+        single = list(range(len(payloads)))
+        # batch idzie jako JSON — hosty, które wymagają formularza, wysyłają pojedynczo
+        if len(payloads) > 1 and self.post_strategy in (None, "json") and self.supports_batch():
+            single = []
+            for start in range(0, len(payloads), WP_BATCH_MAX):
+                idxs = list(range(start, min(start + WP_BATCH_MAX, len(payloads))))
+                out = self._batch(route, [payloads[i] for i in idxs])
+                if out is None:
+                    single.extend(idxs)
+                    continue
+                for i, r in zip(idxs, out):
+                    results[i] = r
+                if self.post_strategy is None and any(st == 201 for st, _ in out):
+                    self.post_strategy = "json"
+                    self.meta.put("strategy", "post", "json")
+        if single:
+            with ThreadPoolExecutor(max_workers=min(WP_PUBLISH_WORKERS, len(single))) as pool:
+                for i, resp in zip(single, pool.map(lambda i: self.create_post(payloads[i], route), single)):
+                    results[i] = (resp.status_code, _json_body(resp))
+        return results
+
+    def invalidate_for(self, status: int, body, payload: dict) -> bool:
+        """Po odrzuceniu posta (404 / nieprawidłowy parametr) usuwa z cache ID użyte w payloadzie.
+        True = coś unieważniono i warto przygotować post ponownie."""
+        if status != 404 and _body_code(body) not in _PAYLOAD_ERRORS:
+            return False
+        term_ids = set(payload.get("categories", [])) | set(payload.get("tags", []))
+        media_id = payload.get("featured_media")
+        n = self.meta.invalidate("categories", lambda v: v in term_ids)
+        n += self.meta.invalidate("tags", lambda v: v in term_ids)
+        n += self.meta.invalidate("media", lambda v: media_id is not None and v[1] == media_id)
+        return n > 0
+
+    def term_id(self, taxonomy: str, name: str, create: bool = True) -> int:
+        """ID kategorii/tagu po nazwie (taxonomy: "categories" | "tags"); 0 = brak."""
+        cached = self.meta.get(taxonomy, _fold(name))
+        if cached:
+            return cached
+        resp = self.get(taxonomy, params={"search": name, "per_page": 20, "_fields": "id,name"}, timeout=10)
+        term = 0
+        if resp.status_code == 200:
+            term = next((t["id"] for t in resp.json() if _fold(t.get("name", "")) == _fold(name)), 0)
+        if not term and create:
+            resp = self.post(taxonomy, json={"name": name}, timeout=10)
+            if resp.status_code == 201:
+                term = resp.json()["id"]
+                print(f"✅ Utworzono {taxonomy} '{name}' (ID {term})", flush=True)
+            elif _error_code(resp) == "term_exists":   # search nie trafił (np. inna pisownia)
+                term = ((resp.json() or {}).get("data") or {}).get("term_id") or 0
+        if term:
+            self.meta.put(taxonomy, _fold(name), term)
+        return term
+
+
+wp = WPClient(os.getenv("WP_URL", ""), os.getenv("WP_USER", ""), os.getenv("WP_APP_PASSWORD", ""))